@@ -8,6 +8,9 @@ from sqlalchemy import pool
 
 from src.models.user_model import Base
 
+# imported for its side effect of registering the table on Base.metadata
+import src.models.refresh_token_model
+
 load_dotenv()
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
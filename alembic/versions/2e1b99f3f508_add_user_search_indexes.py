@@ -0,0 +1,46 @@
+"""add user search indexes
+
+Revision ID: 2e1b99f3f508
+Revises: 831ddc11e62b
+Create Date: 2026-10-18 08:38:42.382010
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2e1b99f3f508"
+down_revision: Union[str, None] = "831ddc11e62b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_COLUMNS = ("email", "name", "surname")
+
+
+def upgrade() -> None:
+    # built concurrently outside the migration transaction, writes to the
+    # user table are not blocked while the indexes are built
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.create_index(
+                f"ix_user_{column}_lower",
+                "user",
+                [sa.text(f"lower({column}) text_pattern_ops")],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in SEARCH_COLUMNS:
+            op.drop_index(
+                f"ix_user_{column}_lower",
+                table_name="user",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
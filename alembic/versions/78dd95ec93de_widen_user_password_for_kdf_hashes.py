@@ -0,0 +1,38 @@
+"""widen user password for kdf hashes
+
+Revision ID: 78dd95ec93de
+Revises: 78338c72e3db
+Create Date: 2026-10-18 08:20:54.054419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "78dd95ec93de"
+down_revision: Union[str, None] = "78338c72e3db"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "user",
+        "password",
+        existing_type=sa.String(length=80),
+        type_=sa.String(length=255),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "user",
+        "password",
+        existing_type=sa.String(length=255),
+        type_=sa.String(length=80),
+        existing_nullable=False,
+    )
@@ -0,0 +1,29 @@
+"""add user version
+
+Revision ID: 831ddc11e62b
+Revises: 78dd95ec93de
+Create Date: 2026-10-18 08:28:31.373243
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "831ddc11e62b"
+down_revision: Union[str, None] = "78dd95ec93de"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "version")
@@ -0,0 +1,45 @@
+"""add refresh token
+
+Revision ID: b0c4aa72be70
+Revises: f6c9a81cf069
+Create Date: 2026-10-18 08:43:56.562863
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b0c4aa72be70"
+down_revision: Union[str, None] = "f6c9a81cf069"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refresh_token",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sid", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("token_hash", sa.String(length=64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("sid"),
+        sa.UniqueConstraint("token_hash"),
+    )
+    op.create_index(
+        "ix_refresh_token_revoked_at",
+        "refresh_token",
+        ["revoked_at"],
+        postgresql_where=sa.text("revoked_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_token_revoked_at", table_name="refresh_token")
+    op.drop_table("refresh_token")
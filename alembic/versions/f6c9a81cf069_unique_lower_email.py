@@ -0,0 +1,80 @@
+"""unique lower email
+
+Revision ID: f6c9a81cf069
+Revises: 2e1b99f3f508
+Create Date: 2026-10-18 08:41:30.208277
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f6c9a81cf069"
+down_revision: Union[str, None] = "2e1b99f3f508"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    duplicates = connection.scalars(
+        sa.text(
+            'SELECT lower(email) FROM "user" GROUP BY 1 HAVING count(*) > 1 LIMIT 20'
+        )
+    ).all()
+    if duplicates:
+        raise RuntimeError(
+            "Emails differing only in case have to be merged before upgrading: "
+            + ", ".join(duplicates)
+        )
+    # every batch commits on its own so row locks are held only briefly, the
+    # version is bumped as the public representation changes
+    with op.get_context().autocommit_block():
+        while connection.execute(
+            sa.text(
+                'UPDATE "user" SET email = lower(email), version = version + 1 '
+                'WHERE id IN (SELECT id FROM "user" WHERE email <> lower(email) '
+                "ORDER BY id LIMIT :batch_size)"
+            ),
+            {"batch_size": BACKFILL_BATCH_SIZE},
+        ).rowcount:
+            pass
+        op.create_index(
+            "uq_user_email_lower",
+            "user",
+            [sa.text("lower(email) text_pattern_ops")],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_user_email_lower",
+            table_name="user",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_constraint("user_email_key", "user", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("user_email_key", "user", ["email"])
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_email_lower",
+            "user",
+            [sa.text("lower(email) text_pattern_ops")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "uq_user_email_lower",
+            table_name="user",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,157 @@
+"""
+Load benchmark of every endpoint, each scenario is driven at a fixed
+concurrency against a single uvicorn worker backed by the DB_URI database.
+
+Usage:
+    python -m benchmarks.endpoints --concurrency 16 --output endpoints.json
+    python -m benchmarks.endpoints --only get list --baseline endpoints.json
+
+Users are created through the API before measuring, with emails unique to
+the run. The started worker logs warnings only and gets the login rate
+limits lifted so the login scenario measures password verification rather
+than rejections, an instance passed with --url keeps its own settings.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import sys
+import uuid
+
+import httpx
+
+from benchmarks.load import drive, single_worker
+from benchmarks.results import add_arguments, finish
+
+PASSWORD = "password"
+WORKER_SETTINGS = {
+    "LOGIN_IP_LIMIT": "1000000000",
+    "LOGIN_EMAIL_LIMIT": "1000000000",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+async def prepare(url: str, users: int):
+    """Function to create the users the scenarios work on and log one in
+
+    Args:
+        url (str): base URL of the service
+        users (int): number of users to create
+
+    Returns:
+        dict: run ID, emails and IDs of the users and an access token
+    """
+    run = uuid.uuid4().hex[:8]
+    emails = [f"bench-{run}-{i}@example.com" for i in range(users)]
+    limits = httpx.Limits(max_connections=16)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        created = await asyncio.gather(
+            *(
+                client.post(
+                    "/user/",
+                    json={
+                        "email": email,
+                        "password": PASSWORD,
+                        "name": "bench",
+                        "surname": "bench",
+                    },
+                )
+                for email in emails
+            )
+        )
+        for response in created:
+            response.raise_for_status()
+        response = await client.post(
+            "/auth/login", json={"email": emails[0], "password": PASSWORD}
+        )
+        response.raise_for_status()
+    return {
+        "run": run,
+        "emails": emails,
+        "ids": [response.json()["id"] for response in created],
+        "token": response.json()["access_token"],
+    }
+
+
+def scenarios(state: dict):
+    """Function to build the request of every scenario
+
+    Args:
+        state (dict): users and token returned by prepare
+
+    Returns:
+        dict: coroutine function sending the request with the given index
+        through the given client by scenario name
+    """
+    emails, ids = state["emails"], state["ids"]
+    # the warm up reuses the indexes, created emails need their own counter
+    created = itertools.count()
+    return {
+        "login": lambda client, i: client.post(
+            "/auth/login",
+            json={"email": emails[i % len(emails)], "password": PASSWORD},
+        ),
+        "authenticate": lambda client, i: client.post(
+            "/auth", json={"access_token": state["token"]}
+        ),
+        "create": lambda client, i: client.post(
+            "/user/",
+            json={
+                "email": f"bench-{state['run']}-new-{next(created)}@example.com",
+                "password": PASSWORD,
+                "name": "bench",
+                "surname": "bench",
+            },
+        ),
+        "get": lambda client, i: client.get(f"/user/{ids[i % len(ids)]}"),
+        "list": lambda client, i: client.get("/user/", params={"limit": 100}),
+        "update": lambda client, i: client.put(
+            f"/user/{ids[i % len(ids)]}", json={"name": f"bench{i % 10000}"}
+        ),
+    }
+
+
+async def main(args: argparse.Namespace):
+    """Function to run the selected scenarios and print a table
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+
+    Returns:
+        int: exit status, 1 when a scenario regressed against the baseline
+    """
+    results = {}
+    with contextlib.ExitStack() as stack:
+        url = args.url or stack.enter_context(single_worker(args.port, WORKER_SETTINGS))
+        state = await prepare(url, args.users)
+        print(
+            f"{'scenario':>14} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>7}"
+        )
+        for name, send in scenarios(state).items():
+            if args.only and name not in args.only:
+                continue
+            # warm up the connection pool and caches before measuring
+            await drive(url, send, args.concurrency, args.concurrency)
+            result = await drive(url, send, args.concurrency, args.requests)
+            results[f"endpoint.{name}"] = {
+                metric: result[metric]
+                for metric in ("rps", "p50_ms", "p99_ms", "errors")
+            }
+            print(
+                f"{name:>14} {result['rps']:>10.1f} {result['p50_ms']:>10.2f} "
+                f"{result['p99_ms']:>10.2f} {result['errors']:>7}"
+            )
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="base URL of a running instance")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", nargs="+", help="names of the scenarios to run")
+    add_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,63 @@
+"""
+Benchmark of password verification throughput, reported as logins per
+second per core for the thread and process hashing pools.
+
+Usage:
+    python -m benchmarks.hashing --logins 200 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import time
+
+from src import security
+from src.security import SecurityManager
+
+
+async def verify_many(hashed: str, logins: int):
+    """Function to verify a password concurrently through the hashing pool
+
+    Args:
+        hashed (str): stored password hash
+        logins (int): number of verifications
+
+    Returns:
+        float: verifications per second
+    """
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(SecurityManager.compare_hash_async(hashed, "password") for _ in range(logins))
+    )
+    return logins / (time.perf_counter() - start)
+
+
+def main(args: argparse.Namespace):
+    """Function to run the benchmark for every pool type and size
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+    """
+    hashed = SecurityManager.hash("password")
+    print(f"algorithm: {hashed.split('$', 1)[0]}, cores: {os.cpu_count()}")
+    print(f"{'executor':>10} {'workers':>8} {'logins/s':>10} {'per core':>10}")
+    for executor_class in (
+        concurrent.futures.ThreadPoolExecutor,
+        concurrent.futures.ProcessPoolExecutor,
+    ):
+        for workers in args.workers:
+            with executor_class(workers) as executor:
+                security._hash_executor = executor  # pylint: disable=protected-access
+                rate = asyncio.run(verify_many(hashed, args.logins))
+            cores = min(workers, os.cpu_count() or 1)
+            name = executor_class.__name__.replace("PoolExecutor", "").lower()
+            print(f"{name:>10} {workers:>8} {rate:>10.1f} {rate / cores:>10.1f}")
+    security._hash_executor = None  # pylint: disable=protected-access
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    main(parser.parse_args())
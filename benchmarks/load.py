@@ -0,0 +1,175 @@
+"""
+Load benchmark measuring how request throughput of a single uvicorn worker
+scales with the number of concurrent clients.
+
+Usage:
+    python -m benchmarks.load --path /user/1 --concurrency 1 4 16 64
+
+A single worker is started with `uvicorn src.main:create_app --factory`
+unless --url points to an already running instance.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import httpx
+from dotenv import dotenv_values
+
+
+async def drive(url: str, send: Callable, concurrency: int, requests: int):
+    """Function to send requests at a fixed concurrency level
+
+    Args:
+        url (str): base URL of the service
+        send (Callable): coroutine function sending the request with the
+        given index through the given client and returning the response
+        concurrency (int): number of concurrent clients
+        requests (int): total number of requests to send
+
+    Returns:
+        dict: throughput, latency and error summary for the level
+    """
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        for index in remaining:
+            start = time.perf_counter()
+            response = await send(client, index)
+            latencies.append(time.perf_counter() - start)
+            errors += response.is_error
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+        "errors": errors,
+    }
+
+
+async def run_level(url: str, path: str, concurrency: int, requests: int):
+    """Function to fire GET requests at a fixed concurrency level
+
+    Args:
+        url (str): base URL of the service
+        path (str): path to request
+        concurrency (int): number of concurrent clients
+        requests (int): total number of requests to send
+
+    Returns:
+        dict: throughput, latency and error summary for the level
+    """
+    return await drive(
+        url, lambda client, index: client.get(path), concurrency, requests
+    )
+
+
+def worker_env(overrides: dict, directory: str):
+    """Function to write a .env for a benchmark worker, the settings of the
+    local .env with the given ones replaced
+
+    Args:
+        overrides (dict): settings to replace
+        directory (str): directory to write the .env to
+    """
+    values = {**dotenv_values(".env"), **overrides}
+    if values.get("JWT_KEYS_DIR"):
+        values["JWT_KEYS_DIR"] = os.path.abspath(values["JWT_KEYS_DIR"])
+    with open(os.path.join(directory, ".env"), "w", encoding="utf-8") as file:
+        for key, value in values.items():
+            escaped = (value or "").replace("\\", "\\\\").replace('"', '\\"')
+            file.write(f'{key}="{escaped}"\n')
+
+
+@contextlib.contextmanager
+def single_worker(port: int, overrides: dict = None):
+    """Context manager running the app in a single uvicorn worker
+
+    Args:
+        port (int): port to bind to
+        overrides (dict, optional): settings replacing the ones of the local
+        .env, the worker then runs in a temporary directory. Defaults to None.
+
+    Yields:
+        str: base URL of the started worker
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # the app reads its settings from .env in the working directory
+        if overrides:
+            worker_env(overrides, directory)
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "src.main:create_app",
+                "--factory",
+                "--app-dir",
+                os.getcwd(),
+                "--workers",
+                "1",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=directory if overrides else None,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(50):
+                with contextlib.suppress(httpx.TransportError):
+                    httpx.get(url + "/")
+                    break
+                time.sleep(0.1)
+            yield url
+        finally:
+            process.terminate()
+            process.wait()
+
+
+async def main(args: argparse.Namespace):
+    """Function to run all concurrency levels and print the results
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+    """
+    with contextlib.ExitStack() as stack:
+        url = args.url or stack.enter_context(single_worker(args.port))
+        # warm up the connection pool before measuring
+        await run_level(url, args.path, max(args.concurrency), max(args.concurrency))
+        print(f"{'concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for concurrency in args.concurrency:
+            result = await run_level(url, args.path, concurrency, args.requests)
+            print(
+                f"{result['concurrency']:>12} {result['rps']:>10.1f} "
+                f"{result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="base URL of a running instance")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/user/1")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    asyncio.run(main(parser.parse_args()))
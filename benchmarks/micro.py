@@ -0,0 +1,92 @@
+"""
+In-process micro-benchmarks of the per-request CPU work: password hashing
+and verification, JWT signing and verification, request validation and
+response serialisation.
+
+Usage:
+    python -m benchmarks.micro --seconds 1 --output micro.json
+    python -m benchmarks.micro --baseline micro.json
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.results import add_arguments, finish
+from benchmarks.serialization import make_rows
+from src.schemas.user_schema import UserCreate, UserGet
+from src.security import SecurityManager, keyring
+from src.utils import FastJSONResponse, dump_trusted
+
+
+def cases():
+    """Function to build the benchmark cases with their inputs prepared
+
+    Returns:
+        dict: function without arguments by benchmark name
+    """
+    hashed = SecurityManager.hash("password")
+    token = keyring.encode({"id": 1, "email": "user@example.com", "sid": "0" * 32})
+    user = {
+        "email": "User@Example.com",
+        "password": "password",
+        "name": "name",
+        "surname": "surname",
+    }
+    rows = make_rows(100)
+    return {
+        "hash": lambda: SecurityManager.hash("password"),
+        "verify": lambda: SecurityManager.compare_hash(hashed, "password"),
+        "jwt_encode": lambda: keyring.encode({"id": 1, "email": "user@example.com"}),
+        "jwt_decode": lambda: keyring.decode(token),
+        "validate_user_create": lambda: UserCreate.model_validate(user),
+        "serialize_users_100": lambda: FastJSONResponse(
+            [dump_trusted(UserGet, row) for row in rows]
+        ).body,
+    }
+
+
+def time_call(call, seconds: float):
+    """Function to call a function repeatedly for a fixed time
+
+    Args:
+        call (Callable): function without arguments
+        seconds (float): time to run for
+
+    Returns:
+        float: microseconds per call
+    """
+    calls = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        call()
+        calls += 1
+    return elapsed / calls * 1e6
+
+
+def main(args: argparse.Namespace):
+    """Function to run the selected cases and print a table
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+
+    Returns:
+        int: exit status, 1 when a case regressed against the baseline
+    """
+    results = {}
+    print(f"{'benchmark':>24} {'us/op':>12}")
+    for name, call in cases().items():
+        if args.only and name not in args.only:
+            continue
+        call()
+        results[f"micro.{name}"] = {"us_per_op": time_call(call, args.seconds)}
+        print(f"{name:>24} {results[f'micro.{name}']['us_per_op']:>12.1f}")
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--only", nargs="+", help="names of the cases to run")
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,184 @@
+"""
+Storage of benchmark results as JSON and their comparison against a saved
+baseline, shared by the micro and endpoint benchmarks.
+
+Usage:
+    python -m benchmarks.results baseline.json latest.json --tolerance 0.1
+
+Exits with status 1 when a metric of the second file is worse than the
+baseline by more than the tolerance.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+
+# metrics where a higher value is better, every other metric is a cost
+HIGHER_IS_BETTER = {"rps"}
+
+
+def metadata():
+    """Function to describe the environment the results were taken in
+
+    Returns:
+        dict: time, commit, python version and number of cores
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "cores": os.cpu_count(),
+    }
+
+
+def save(path: str, results: dict):
+    """Function to write results to a JSON file
+
+    Args:
+        path (str): output file
+        results (dict): metrics by benchmark name
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"meta": metadata(), "results": results}, file, indent=2)
+        file.write("\n")
+
+
+def load(path: str):
+    """Function to read results written by save
+
+    Args:
+        path (str): results file
+
+    Returns:
+        dict: metrics by benchmark name
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+
+def compare(baseline: dict, current: dict, tolerance: float):
+    """Function to compare every metric present in both results
+
+    Args:
+        baseline (dict): metrics by benchmark name of the baseline
+        current (dict): metrics by benchmark name of the new run
+        tolerance (float): relative change allowed before a metric regresses
+
+    Returns:
+        List[dict]: name, metric, baseline and current value, relative
+        change where positive is worse, and whether it regressed
+    """
+    rows = []
+    for name, metrics in current.items():
+        for metric, after in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if before is None:
+                continue
+            worse = before - after if metric in HIGHER_IS_BETTER else after - before
+            if before:
+                change = worse / abs(before)
+            else:
+                change = math.copysign(math.inf, worse) if worse else 0.0
+            rows.append(
+                {
+                    "name": name,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": change,
+                    "regressed": change > tolerance,
+                }
+            )
+    return rows
+
+
+def report(rows: list):
+    """Function to print a comparison table
+
+    Args:
+        rows (list): rows returned by compare
+
+    Returns:
+        bool: True if any metric regressed
+    """
+    print(
+        f"{'benchmark':>28} {'metric':>10} {'baseline':>12} {'current':>12} {'worse':>7}"
+    )
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(
+            f"{row['name']:>28} {row['metric']:>10} {row['baseline']:>12.2f} "
+            f"{row['current']:>12.2f} {row['change']:>+7.1%}{flag}"
+        )
+    return any(row["regressed"] for row in rows)
+
+
+def add_arguments(benchmark_parser: argparse.ArgumentParser):
+    """Function to add the output and baseline options to a benchmark
+
+    Args:
+        benchmark_parser (argparse.ArgumentParser): benchmark argument parser
+    """
+    benchmark_parser.add_argument(
+        "--output", help="write the results to this JSON file"
+    )
+    benchmark_parser.add_argument(
+        "--baseline", help="compare against this results file"
+    )
+    benchmark_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="relative change allowed before a metric regresses",
+    )
+
+
+def finish(results: dict, args: argparse.Namespace):
+    """Function to save the results and compare them against the baseline
+
+    Args:
+        results (dict): metrics by benchmark name
+        args (argparse.Namespace): arguments added by add_arguments
+
+    Returns:
+        int: exit status, 1 when a metric regressed
+    """
+    if args.output:
+        save(args.output, results)
+    if args.baseline:
+        return int(report(compare(load(args.baseline), results, args.tolerance)))
+    return 0
+
+
+def main(args: argparse.Namespace):
+    """Function to compare two saved results files and print a table
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+
+    Returns:
+        int: exit status, 1 when a metric regressed against the baseline
+    """
+    return int(report(compare(load(args.baseline), load(args.current), args.tolerance)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""
+Benchmark of the serialisation cost per response of the user list, FastAPI
+validating the rows into the response model and encoding them with the
+stdlib json module against the trusted pydantic-core path.
+
+Usage:
+    python -m benchmarks.serialization --rows 1 100 1000
+"""
+
+import argparse
+import asyncio
+import collections
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.schemas.user_schema import UserGet
+from src.utils import FastJSONResponse, dump_trusted
+
+# stand-in for sqlalchemy Row, which also exposes the columns as attributes
+UserRow = collections.namedtuple("UserRow", "id email name surname version")
+
+
+def make_rows(count: int):
+    """Function to build rows shaped like the ones the user list query returns
+
+    Args:
+        count (int): number of rows
+
+    Returns:
+        List[UserRow]: named tuples of id, email, name, surname and version
+    """
+    return [
+        UserRow(i, f"user{i}@example.com", f"name{i}", f"surname{i}", 1)
+        for i in range(count)
+    ]
+
+
+async def validated(rows, field):
+    """Function to render a response the way FastAPI does for response_model
+
+    Args:
+        rows (List[UserRow]): rows to render
+        field (ModelField): response field of List[UserGet]
+
+    Returns:
+        bytes: response body
+    """
+    content = await serialize_response(field=field, response_content=rows)
+    return JSONResponse(content).body
+
+
+async def trusted(rows, field):  # pylint: disable=unused-argument
+    """Function to render a response from trusted rows without validation
+
+    Args:
+        rows (List[UserRow]): rows to render
+        field (ModelField): unused
+
+    Returns:
+        bytes: response body
+    """
+    return FastJSONResponse([dump_trusted(UserGet, row) for row in rows]).body
+
+
+async def time_render(render, rows, field, seconds: float):
+    """Function to render responses repeatedly for a fixed time
+
+    Args:
+        render (Callable): render function
+        rows (List[UserRow]): rows to render
+        field (ModelField): response field of List[UserGet]
+        seconds (float): time to run for
+
+    Returns:
+        float: microseconds per response
+    """
+    calls = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        await render(rows, field)
+        calls += 1
+    return elapsed / calls * 1e6
+
+
+async def main(args: argparse.Namespace):
+    """Function to run the benchmark for every page size
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+    """
+    field = create_response_field(name="Response", type_=List[UserGet])
+    print(f"{'rows':>6} {'validated us':>13} {'trusted us':>11} {'speedup':>8}")
+    for count in args.rows:
+        rows = make_rows(count)
+        assert await validated(rows, field) == await trusted(rows, field)
+        before = await time_render(validated, rows, field, args.seconds)
+        after = await time_render(trusted, rows, field, args.seconds)
+        print(f"{count:>6} {before:>13.1f} {after:>11.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark of the per-call overhead of the hot user lookups, comparing
+statements built for every call with the cached lambda statements.
+
+Usage:
+    python -m benchmarks.statements --calls 2000
+
+The build section times statement construction and cache key generation
+only, the query section runs the lookups against DB_URI and needs a user
+with ID 1.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func, select
+
+from src.crud.user_crud import USER_COLUMNS, select_user_by_email, select_user_by_id
+from src.database import SessionLocal, engine
+from src.models.user_model import User
+
+# every plain statement is the same query as its cached counterpart
+LOOKUPS = {
+    "by_id": (
+        lambda: select(*USER_COLUMNS).where(User.id == 1),
+        lambda: select_user_by_id(1),
+    ),
+    "by_email": (
+        lambda: select(User).where(func.lower(User.email) == "user@example.com"),
+        lambda: select_user_by_email("user@example.com"),
+    ),
+}
+
+
+def time_build(build, calls: int):
+    """Function to time building a statement and its compiled cache key
+
+    Args:
+        build (Callable): function returning a statement
+        calls (int): number of calls
+
+    Returns:
+        float: microseconds per call
+    """
+    start = time.perf_counter()
+    for _ in range(calls):
+        build()._generate_cache_key()  # pylint: disable=protected-access
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def time_query(build, calls: int):
+    """Function to time running a lookup in a fresh session, as a request does
+
+    Args:
+        build (Callable): function returning a statement
+        calls (int): number of calls
+
+    Returns:
+        float: microseconds per call
+    """
+    start = time.perf_counter()
+    for _ in range(calls):
+        async with SessionLocal() as session:
+            await session.scalar(build())
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def main(args: argparse.Namespace):
+    """Function to run the benchmark and print a table per section
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+    """
+    print(f"{'section':>8} {'lookup':>10} {'select us':>10} {'lambda us':>10}")
+    for name, (plain, cached) in LOOKUPS.items():
+        before, after = time_build(plain, args.calls), time_build(cached, args.calls)
+        print(f"{'build':>8} {name:>10} {before:>10.1f} {after:>10.1f}")
+    for name, (plain, cached) in LOOKUPS.items():
+        # warm up the connection pool and the prepared statements
+        await time_query(plain, 10)
+        await time_query(cached, 10)
+        before = await time_query(plain, args.calls)
+        after = await time_query(cached, args.calls)
+        print(f"{'query':>8} {name:>10} {before:>10.1f} {after:>10.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
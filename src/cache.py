@@ -0,0 +1,364 @@
+"""
+Module containing in-process and shared caches
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from src.metrics import LATENCY_BUCKETS, Histogram
+
+logger = logging.getLogger(__name__)
+
+# stores the value unless the key holds an entry of a higher version
+_SET_IF_NOT_OLDER = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version'))
+if ARGV[3] ~= '' and current and current > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'value', ARGV[1], 'version', ARGV[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class LRUCache:
+    """
+    Bounded least recently used cache with per-entry expiry
+    """
+
+    def __init__(self, max_size: int, ttl: float = None):
+        """Constructor method
+
+        Args:
+            max_size (int): maximum number of entries kept
+            ttl (float, optional): default seconds an entry lives. Defaults to None.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Function to get a value, expired entries count as misses
+
+        Args:
+            key (Hashable): cache key
+
+        Returns:
+            Any: cached value or None
+        """
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, expires_at: float = None, version: int = None):
+        """Function to store a value, evicting the least recently used entry
+        when the cache is full
+
+        Args:
+            key (Hashable): cache key
+            value (Any): value to store
+            expires_at (float, optional): unix time the entry expires at, capped
+            by the default ttl. Defaults to None.
+            version (int, optional): version of the value, a live entry of a
+            higher version is kept instead. Defaults to None.
+        """
+        if self.max_size <= 0:
+            return
+        current = self._entries.get(key)
+        if current and None not in (version, current[2]) and current[2] > version:
+            if current[1] is None or current[1] > time.time():
+                return
+        if self.ttl is not None:
+            ttl_expiry = time.time() + self.ttl
+            expires_at = (
+                ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+            )
+        self._entries[key] = (value, expires_at, version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Function to remove a value
+
+        Args:
+            key (Hashable): cache key
+        """
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Function to remove all values and reset the counters
+        """
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        """Function to get the cache counters
+
+        Returns:
+            dict: size, hits, misses and hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class MemorySharedCache:
+    """
+    In-memory stand-in for a shared cache backend, mirrors the RedisCache
+    interface so tests and single instance setups do not need Redis
+    """
+
+    def __init__(self):
+        """
+        Constructor method
+        """
+        self._entries = {}
+
+    async def get(self, key: str):
+        """Function to get a value
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            bytes | None: cached value
+        """
+        value, expires_at, _ = self._entries.get(key, (None, None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float, version: int = None):
+        """Function to store a value
+
+        Args:
+            key (str): cache key
+            value (bytes): value to store
+            ttl (float): seconds the value lives
+            version (int, optional): version of the value, a live entry of a
+            higher version is kept instead. Defaults to None.
+        """
+        now = time.time()
+        current = self._entries.get(key)
+        if current and None not in (version, current[2]) and current[2] > version:
+            if current[1] > now:
+                return
+        self._entries[key] = (value, now + ttl, version)
+
+    async def delete(self, key: str):
+        """Function to remove a value
+
+        Args:
+            key (str): cache key
+        """
+        self._entries.pop(key, None)
+
+
+class RedisCache:
+    """
+    Shared cache backend stored in Redis, requires the optional redis package
+    """
+
+    def __init__(self, url: str):
+        """Constructor method
+
+        Args:
+            url (str): Redis URL, e.g. redis://localhost:6379/0
+        """
+        import redis.asyncio  # pylint: disable=import-outside-toplevel,import-error
+
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._set_if_not_older = self._client.register_script(_SET_IF_NOT_OLDER)
+
+    async def get(self, key: str):
+        """Function to get a value
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            bytes | None: cached value
+        """
+        return await self._client.hget(key, "value")
+
+    async def set(self, key: str, value: bytes, ttl: float, version: int = None):
+        """Function to store a value, the version check and the write are one
+        atomic script
+
+        Args:
+            key (str): cache key
+            value (bytes): value to store
+            ttl (float): seconds the value lives
+            version (int, optional): version of the value, a live entry of a
+            higher version is kept instead. Defaults to None.
+        """
+        await self._set_if_not_older(
+            keys=[key],
+            args=[value, int(ttl * 1000), "" if version is None else version],
+        )
+
+    async def delete(self, key: str):
+        """Function to remove a value
+
+        Args:
+            key (str): cache key
+        """
+        await self._client.delete(key)
+
+
+class ReadThroughCache:
+    """
+    Two tier cache of serialised payloads, an in-process LRU in front of an
+    optional shared backend
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        local: LRUCache,
+        shared=None,
+        ttl: float = 60,
+        version_of: Callable[[bytes], int] = None,
+    ):  # pylint: disable=too-many-arguments
+        """Constructor method
+
+        Args:
+            prefix (str): namespace of the keys in the shared backend
+            local (LRUCache): in-process tier
+            shared (MemorySharedCache | RedisCache, optional): shared tier. Defaults to None.
+            ttl (float, optional): seconds entries live in the shared tier. Defaults to 60.
+            version_of (Callable[[bytes], int], optional): function reading the
+            version of a payload, when given no tier replaces a payload with
+            one of a lower version. Defaults to None.
+        """
+        self.prefix = prefix
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.version_of = version_of
+        self.shared_hits = 0
+        self.lookup_seconds = Histogram(LATENCY_BUCKETS)
+
+    async def get(self, key):
+        """Function to get a payload from the first tier holding it
+
+        Args:
+            key (Hashable): cache key
+
+        Returns:
+            bytes | None: cached payload
+        """
+        start = time.perf_counter()
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            try:
+                value = await self.shared.get(f"{self.prefix}:{key}")
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.warning("Shared cache get failed: %s", exc)
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value, version=self._version(value))
+        self.lookup_seconds.observe(time.perf_counter() - start)
+        return value
+
+    def _version(self, value: bytes):
+        return None if self.version_of is None else self.version_of(value)
+
+    async def set(self, key, value: bytes):
+        """Function to store a payload in every tier, tiers holding a payload
+        of a higher version keep it
+
+        Args:
+            key (Hashable): cache key
+            value (bytes): payload
+        """
+        version = self._version(value)
+        self.local.set(key, value, version=version)
+        if self.shared is not None:
+            try:
+                await self.shared.set(
+                    f"{self.prefix}:{key}", value, self.ttl, version=version
+                )
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.warning("Shared cache set failed: %s", exc)
+
+    async def delete(self, key):
+        """Function to remove a payload from every tier
+
+        Args:
+            key (Hashable): cache key
+        """
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(f"{self.prefix}:{key}")
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.warning("Shared cache delete failed: %s", exc)
+
+    def clear(self):
+        """
+        Function to empty the local tier and reset the counters
+        """
+        self.local.clear()
+        self.shared_hits = 0
+        self.lookup_seconds = Histogram(LATENCY_BUCKETS)
+
+    def stats(self):
+        """Function to get hit ratio and lookup latency
+
+        Returns:
+            dict: local and shared tier counters with the latency histogram
+        """
+        local = self.local.stats()
+        hits = local["hits"] + self.shared_hits
+        lookups = local["hits"] + local["misses"]
+        return {
+            "size": local["size"],
+            "max_size": local["max_size"],
+            "hits": hits,
+            "local_hits": local["hits"],
+            "shared_hits": self.shared_hits,
+            "misses": local["misses"] - self.shared_hits,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "lookup_seconds": self.lookup_seconds.snapshot(),
+        }
+
+
+def shared_backend(name: str, url: str = None):
+    """Function to create the configured shared cache backend
+
+    Args:
+        name (str): memory, redis or empty for none
+        url (str, optional): backend URL. Defaults to None.
+
+    Raises:
+        ValueError: When the backend is unknown
+
+    Returns:
+        MemorySharedCache | RedisCache | None: shared backend
+    """
+    if not name:
+        return None
+    if name == "memory":
+        return MemorySharedCache()
+    if name == "redis":
+        return RedisCache(url)
+    raise ValueError(f"Unsupported cache backend: {name}")
@@ -1,27 +1,235 @@
+import datetime
+import math
+import secrets
+
 from src.errors import CustomException
-from src.security import SecurityManager
-from src.schemas.auth_schema import LoginSchema
+from src.database import SessionLocal
+from src.ratelimit import RateLimiter, bucket_store
+from src.security import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    SecurityManager,
+    env_values,
+    revoked_sessions,
+)
+from src.schemas.auth_schema import LoginSchema, RefreshSchema
+from src.models.refresh_token_model import RefreshToken
 from src.models.user_model import User
-from sqlalchemy.orm import Session
+from src.crud.user_crud import select_user_by_email
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas.user_schema import UserGet
 
+rate_limit_store = bucket_store(
+    env_values.get("RATE_LIMIT_BACKEND", "memory"),
+    env_values.get("RATE_LIMIT_REDIS_URL"),
+)
+# every login attempt of a client IP spends a token
+login_ip_limiter = RateLimiter(
+    "login-ip",
+    rate_limit_store,
+    int(env_values.get("LOGIN_IP_LIMIT", 20)),
+    float(env_values.get("LOGIN_IP_PERIOD_SECONDS", 60)),
+)
+# only failed attempts spend a token of the email, so guessing can not lock
+# the owner out once the guesses stop
+login_email_limiter = RateLimiter(
+    "login-email",
+    rate_limit_store,
+    int(env_values.get("LOGIN_EMAIL_LIMIT", 5)),
+    float(env_values.get("LOGIN_EMAIL_PERIOD_SECONDS", 300)),
+)
+
 
-async def crud_login(session: Session, schema: LoginSchema):
-    """CRUD function to login
+async def check_login_rate(client_ip: str | None, email: str):
+    """Function to throttle login attempts per client IP and per email, runs
+    before any database or hashing work
 
     Args:
-        session (Session): database session
+        client_ip (str | None): IP address of the client, None when the server
+        does not know it, e.g. behind a unix socket, skips the IP limit
+        email (str): email the client logs in with
+
+    Raises:
+        CustomException: When either limit is exhausted
+    """
+    retry_after = (
+        client_ip is not None and await login_ip_limiter.hit(client_ip)
+    ) or await login_email_limiter.hit(email, cost=0)
+    if retry_after:
+        raise CustomException(
+            429,
+            "Too many requests",
+            "Too many login attempts, please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def refresh_token_expiry():
+    """Function to get the expiry of a refresh token issued now
+
+    Returns:
+        datetime.datetime: expiry time
+    """
+    return datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
+        days=REFRESH_TOKEN_EXPIRE_DAYS
+    )
+
+
+def issue_tokens(user, sid: str, refresh_token: str):
+    """Function to build the token pair of a login session
+
+    Args:
+        user (User | Row): user the tokens are issued to
+        sid (str): session ID
+        refresh_token (str): refresh token of the session
+
+    Returns:
+        dict: access and refresh token
+    """
+    claims = UserGet.model_validate(user).model_dump()
+    claims["sid"] = sid
+    return {
+        "access_token": SecurityManager.generate_jwt(claims),
+        "refresh_token": refresh_token,
+    }
+
+
+async def crud_login(
+    session: AsyncSession, schema: LoginSchema, write_session: AsyncSession = None
+):
+    """CRUD function to login and start a new session
+
+    Args:
+        session (AsyncSession): database session, may be a read replica
         request_body (LoginSchema): schema containing data
+        write_session (AsyncSession, optional): primary database session used
+        to store the session and upgrade outdated hashes. Defaults to session.
+
+    Raises:
+        CustomException: When the email or password is incorrect
 
     Returns:
-        User: User object which was updated
+        dict: access and refresh token
     """
-    if found := session.query(User).filter_by(email=schema.email).first():
-        if SecurityManager.compare_hash(found.password, schema.password):
-            return {
-                "access_token": SecurityManager.generate_jwt(
-                    UserGet.model_validate(found).model_dump()
-                ),
-            }
+    found = await session.scalar(select_user_by_email(schema.email))
+    if found is None:
+        # verify anyway, the response time must not tell whether the email exists
+        await SecurityManager.compare_hash_async(
+            SecurityManager.dummy_hash(), schema.password
+        )
+    elif await SecurityManager.compare_hash_async(found.password, schema.password):
+        write_session = write_session or session
+        # upgrade hashes made with an outdated scheme while the password is known
+        if SecurityManager.needs_rehash(found.password):
+            # plain UPDATE on the primary, the row may come from a replica
+            # and the hash is not part of the versioned representation
+            await write_session.execute(
+                update(User)
+                .where(User.id == found.id)
+                .values(password=await SecurityManager.hash_async(schema.password))
+            )
+        sid = secrets.token_hex(16)
+        refresh_token, token_hash = SecurityManager.generate_refresh_token()
+        await write_session.execute(
+            insert(RefreshToken).values(
+                sid=sid,
+                user_id=found.id,
+                token_hash=token_hash,
+                expires_at=refresh_token_expiry(),
+            )
+        )
+        await write_session.commit()
+        return issue_tokens(found, sid, refresh_token)
+    await login_email_limiter.hit(schema.email)
     raise CustomException(401, "Invalid credentials", "Incorrect email or password.")
+
+
+async def crud_refresh(session: AsyncSession, schema: RefreshSchema):
+    """CRUD function to renew the tokens of a session, the refresh token is
+    rotated so every refresh token can be used once
+
+    Args:
+        session (AsyncSession): primary database session
+        schema (RefreshSchema): schema containing data
+
+    Raises:
+        CustomException: When the refresh token is unknown, used, expired or
+        its session revoked
+
+    Returns:
+        dict: access and refresh token
+    """
+    refresh_token, token_hash = SecurityManager.generate_refresh_token()
+    # Core UPDATE ... FROM "user", ORM enabled updates can not return the
+    # columns of another table
+    found = (
+        await session.execute(
+            update(RefreshToken.__table__)
+            .where(
+                RefreshToken.token_hash
+                == SecurityManager.refresh_token_hash(schema.refresh_token),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > func.now(),
+                RefreshToken.user_id == User.id,
+            )
+            .values(token_hash=token_hash, expires_at=refresh_token_expiry())
+            .returning(RefreshToken.sid, User.id, User.email, User.name, User.surname)
+        )
+    ).first()
+    if found is None:
+        raise CustomException(
+            401, "Invalid refresh token", "Refresh token is invalid, please login."
+        )
+    await session.commit()
+    return issue_tokens(found, found.sid, refresh_token)
+
+
+async def crud_logout(session: AsyncSession, schema: RefreshSchema):
+    """CRUD function to end a session, access tokens issued for it are
+    rejected from now on
+
+    Args:
+        session (AsyncSession): primary database session
+        schema (RefreshSchema): schema containing data
+
+    Raises:
+        CustomException: When the refresh token is unknown or already revoked
+    """
+    sid = await session.scalar(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash
+            == SecurityManager.refresh_token_hash(schema.refresh_token),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=func.now())
+        .returning(RefreshToken.sid)
+    )
+    if sid is None:
+        raise CustomException(
+            401, "Invalid refresh token", "Refresh token is invalid, please login."
+        )
+    await session.commit()
+    # other instances pick the revocation up on their next refresh
+    revoked_sessions.add(sid)
+
+
+async def crud_get_revocations(since: datetime.datetime):
+    """CRUD function to get the sessions revoked since a given time, runs in
+    its own session as it is called by the background refresher
+
+    Args:
+        since (datetime.datetime): earliest revocation time
+
+    Returns:
+        List[Row]: sid and revoked_at, ordered by revoked_at
+    """
+    async with SessionLocal() as session:
+        return (
+            await session.execute(
+                select(RefreshToken.sid, RefreshToken.revoked_at)
+                .where(RefreshToken.revoked_at >= since)
+                .order_by(RefreshToken.revoked_at)
+            )
+        ).all()
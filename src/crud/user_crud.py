@@ -2,43 +2,170 @@
 Module containing the CRUD functions for the user model
 """
 
-from sqlalchemy.orm import Session
+import asyncio
+import base64
+import binascii
+import itertools
+import json
+import time
+from typing import Callable, Iterable
 
+import pydantic_core
+from pydantic import ValidationError
+from sqlalchemy import Column, MetaData, Row, Table, func, lambda_stmt, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from src.cache import LRUCache, ReadThroughCache, shared_backend
 from src.errors import CustomException
-from src.security import SecurityManager
+from src.security import SecurityManager, env_values
 from src.models.user_model import User
-from src.schemas.user_schema import UserChangePassword, UserCreate
+from src.schemas.user_schema import UserChangePassword, UserCreate, UserGet
+from src.utils import dump_trusted, etag_matches, make_etag
+
+# row version and serialised UserGet payload keyed by user ID
+user_cache = ReadThroughCache(
+    "user",
+    LRUCache(
+        int(env_values.get("USER_CACHE_SIZE", 10000)),
+        float(env_values.get("USER_CACHE_LOCAL_TTL_SECONDS", 30)),
+    ),
+    shared_backend(
+        env_values.get("USER_CACHE_BACKEND"), env_values.get("USER_CACHE_REDIS_URL")
+    ),
+    float(env_values.get("USER_CACHE_TTL_SECONDS", 300)),
+    # a read-fill racing a write must not replace the entry the write cached
+    version_of=lambda entry: unpack_user(entry)[0],
+)
+
+
+# public columns read by the user routes, rows of them validate into UserGet
+# directly without constructing ORM instances or loading the password
+USER_COLUMNS = (User.id, User.email, User.name, User.surname, User.version)
+# columns the user list can be filtered on by prefix
+SEARCH_COLUMNS = {"email": User.email, "name": User.name, "surname": User.surname}
+
+# built once at import instead of per call, the engine caches its compiled form
+INSERT_USER = (
+    insert(User)
+    .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+    .returning(User)
+)
+
+
+def select_user_by_id(user_id: int):
+    """Function to get the cached statement selecting the public columns of
+    a user by ID
+
+    Args:
+        user_id (int): ID of user
+
+    Returns:
+        StatementLambdaElement: SELECT statement
+    """
+    # lambda_stmt caches the construct and its compiled form keyed by the
+    # lambda code, only the bound values change
+    return lambda_stmt(lambda: select(*USER_COLUMNS).where(User.id == user_id))
+
+
+def select_user_by_email(email: str):
+    """Function to get the cached statement selecting a user by email,
+    case-insensitive through uq_user_email_lower
+
+    Args:
+        email (str): email of user
+
+    Returns:
+        StatementLambdaElement: SELECT statement
+    """
+    email = email.lower()
+    return lambda_stmt(lambda: select(User).where(func.lower(User.email) == email))
+
+
+def select_user_version(user_id: int):
+    """Function to get the cached statement selecting the row version of a user
+
+    Args:
+        user_id (int): ID of user
+
+    Returns:
+        StatementLambdaElement: SELECT statement
+    """
+    return lambda_stmt(lambda: select(User.version).where(User.id == user_id))
+
+
+def pack_user(user: User | Row):
+    """Function to serialise the public data of a user with its row version
+
+    Args:
+        user (User | Row): user or row of USER_COLUMNS to serialise
 
+    Returns:
+        bytes: cache entry, the version line followed by the UserGet JSON
+    """
+    return b"%d\n%s" % (
+        user.version,
+        pydantic_core.to_json(dump_trusted(UserGet, user)),
+    )
+
+
+def unpack_user(entry: bytes):
+    """Function to split a cache entry made by pack_user
+
+    Args:
+        entry (bytes): cache entry
+
+    Returns:
+        Tuple[int, bytes]: row version and UserGet JSON
+    """
+    version, body = entry.split(b"\n", 1)
+    return int(version), body
+
+
+async def cache_user(user: User):
+    """Function to store the serialised public data of a user in the cache
+
+    Args:
+        user (User): user to cache
+    """
+    await user_cache.set(user.id, pack_user(user))
 
-async def crud_create_user(session: Session, schema: UserCreate):
-    """CRUD function to create a new User
+
+async def crud_create_user(session: AsyncSession, schema: UserCreate):
+    """CRUD function to create a new User with a single INSERT ... ON CONFLICT
+    statement, the unique lower(email) index decides if the user already exists
 
     Args:
-        session (Session): database session
+        session (AsyncSession): database session
         schema (UserCreate): schema containing data
 
+    Raises:
+        CustomException: When email is already taken
+
     Returns:
         User: User object which was created
     """
     # hashing password before save
-    if session.query(User).filter_by(email=schema.email).first():
+    values = schema.model_dump()
+    values["password"] = await SecurityManager.hash_async(schema.password)
+    new_user = await session.scalar(INSERT_USER, values)
+    if new_user is None:
         raise CustomException(
             422,
             "Invalid email",
             "User with this email already exists.",
         )
-    new_user = User(**schema.model_dump())
-    new_user.password = SecurityManager.hash(hash_string=new_user.password)
-    session.add(new_user)
-    session.commit()
+    await session.commit()
+    await cache_user(new_user)
     return new_user
 
 
-async def crud_change_password(session: Session, schema: UserChangePassword):
+async def crud_change_password(session: AsyncSession, schema: UserChangePassword):
     """CRUD function to change the password of a User
 
     Args:
-        session (Session): database session
+        session (AsyncSession): database session
         schema (UserChangePassword): schema containing data
 
     Raises:
@@ -48,10 +175,13 @@ async def crud_change_password(session: Session, schema: UserChangePassword):
     Returns:
         User: User object which was updated
     """
-    if found := session.query(User).get(schema.id):
-        if SecurityManager.compare_hash(found.password, schema.old_password):
-            found.password = SecurityManager.hash(hash_string=schema.new_password)
-            session.commit()
+    if found := await session.get(User, schema.id):
+        if await SecurityManager.compare_hash_async(
+            found.password, schema.old_password
+        ):
+            found.password = await SecurityManager.hash_async(schema.new_password)
+            await session.commit()
+            await cache_user(found)
             return found
         else:
             raise CustomException(
@@ -64,57 +194,343 @@ async def crud_change_password(session: Session, schema: UserChangePassword):
     )
 
 
-async def crud_get_all_users(session: Session):
-    """CRUD function to get all User data
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+def encode_cursor(user_id: int):
+    """Function to build an opaque pagination cursor
+
+    Args:
+        user_id (int): ID of the last user on the page
+
+    Returns:
+        str: cursor pointing after the given user
+    """
+    return base64.urlsafe_b64encode(json.dumps({"id": user_id}).encode()).decode()
+
+
+def decode_cursor(cursor: str | None):
+    """Function to read the user ID out of a pagination cursor
+
+    Args:
+        cursor (str | None): cursor returned by a previous page
+
+    Raises:
+        CustomException: When the cursor is malformed
+
+    Returns:
+        int | None: ID of the last user already returned
+    """
+    if cursor is None:
+        return None
+    try:
+        user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        raise CustomException(422, "Invalid cursor", "Cursor is malformed.") from exc
+    if not isinstance(user_id, int):
+        raise CustomException(422, "Invalid cursor", "Cursor is malformed.")
+    return user_id
+
+
+def select_users_after(cursor: str | None, filters: dict = None):
+    """Function to build the keyset query for users following a cursor
+
+    Args:
+        cursor (str | None): cursor returned by a previous page
+        filters (dict, optional): case-insensitive prefixes keyed by
+        SEARCH_COLUMNS name, empty values are ignored. Defaults to None.
+
+    Returns:
+        Select: query of USER_COLUMNS ordered by User.id
+    """
+    query = select(*USER_COLUMNS).order_by(User.id)
+    if (after_id := decode_cursor(cursor)) is not None:
+        query = query.where(User.id > after_id)
+    for field, prefix in (filters or {}).items():
+        if prefix:
+            # served by the lower() text_pattern_ops indexes of the model
+            query = query.where(
+                func.lower(SEARCH_COLUMNS[field]).startswith(
+                    prefix.lower(), autoescape=True
+                )
+            )
+    return query
+
+
+async def crud_get_all_users(
+    session: AsyncSession,
+    limit: int = PAGE_LIMIT_DEFAULT,
+    cursor: str = None,
+    filters: dict = None,
+):
+    """CRUD function to get a page of User data
+
+    Args:
+        session (AsyncSession): database session
+        limit (int, optional): page size. Defaults to PAGE_LIMIT_DEFAULT.
+        cursor (str, optional): cursor returned by a previous page. Defaults to None.
+        filters (dict, optional): case-insensitive prefixes keyed by
+        SEARCH_COLUMNS name. Defaults to None.
+
+    Returns:
+        Tuple[List[Row], str | None]: users on the page and cursor of the next page
+    """
+    query = select_users_after(cursor, filters).limit(limit + 1)
+    users = (await session.execute(query)).all()
+    if len(users) > limit:
+        return users[:limit], encode_cursor(users[limit - 1].id)
+    return users, None
+
+
+async def crud_stream_users(
+    session: AsyncSession, cursor: str = None, filters: dict = None
+):
+    """CRUD function to stream User data from a server-side cursor
+
+    Args:
+        session (AsyncSession): database session
+        cursor (str, optional): cursor to start after. Defaults to None.
+        filters (dict, optional): case-insensitive prefixes keyed by
+        SEARCH_COLUMNS name. Defaults to None.
+
+    Yields:
+        Row: users ordered by ID
+    """
+    query = select_users_after(cursor, filters).execution_options(
+        yield_per=STREAM_CHUNK_SIZE
+    )
+    async for user in await session.stream(query):
+        yield user
+
+
+async def crud_get_user_version(session: AsyncSession, user_id: int):
+    """CRUD function to get only the row version of a User, without loading
+    the full row
 
     Args:
-        session (Session): database session
+        session (AsyncSession): database session
+        user_id (int): ID of user
 
     Returns:
-        List[User]: List of all users
+        int | None: row version or None if the user does not exist
     """
-    return session.query(User).all()
+    if (entry := await user_cache.get(user_id)) is not None:
+        return unpack_user(entry)[0]
+    return await session.scalar(select_user_version(user_id))
 
 
-async def crud_get_user_by_id(session: Session, user_id: int):
-    """CRUD function to get User data by ID
+async def crud_get_user_by_id(session: AsyncSession, user_id: int):
+    """CRUD function to get User data by ID, rows read from a replica are
+    returned without filling the cache
 
     Args:
-        session (Session): database session
+        session (AsyncSession): database session
         user_id (int): ID of user to get
 
     Raises:
         CustomException: When resource not found
 
     Returns:
-        User: User object which was fetched
+        Tuple[int, bytes]: row version and serialised UserGet data
     """
-    if response := session.query(User).get(user_id):
-        return response
+    if (entry := await user_cache.get(user_id)) is not None:
+        return unpack_user(entry)
+    if response := (await session.execute(select_user_by_id(user_id))).first():
+        entry = pack_user(response)
+        # a lagging replica may return a row older than the last write
+        if not session.info.get("replica"):
+            await user_cache.set(user_id, entry)
+        return unpack_user(entry)
     raise CustomException(
         200, "Resource not found", f"User with ID:{user_id} not found."
     )
 
 
-async def crud_update_user(session: Session, user_id: int, schema: UserCreate):
+async def crud_update_user(
+    session: AsyncSession,
+    user_id: int,
+    schema: UserCreate,
+    if_match: str = None,
+):
     """CRUD function to update User data
 
     Args:
-        session (Session): database session
+        session (AsyncSession): database session
         user_id (int): ID of user to update
         schema (UserCreate): schema containing data
+        if_match (str, optional): If-Match header the current ETag has to
+        match. Defaults to None.
 
     Raises:
         CustomException: When resource not found
+        CustomException: When if_match does not match or the row was changed
+        concurrently
 
     Returns:
         User: User object which was updated
     """
-    if found := session.query(User).get(user_id):
+    if found := await session.get(User, user_id):
+        etag = make_etag(user_id, found.version)
+        if if_match is not None and not etag_matches(if_match, etag):
+            raise CustomException(
+                412,
+                "Precondition failed",
+                f"User with ID {user_id} was modified, fetch it again.",
+            )
         for field, value in schema.model_dump(exclude_unset=True).items():
             setattr(found, field, value)
-        session.commit()
+        try:
+            await session.commit()
+        except StaleDataError as exc:
+            raise CustomException(
+                412,
+                "Precondition failed",
+                f"User with ID {user_id} was modified, fetch it again.",
+            ) from exc
+        await cache_user(found)
         return found
     raise CustomException(
         200, "Resource not found", f"User with ID {user_id} not found."
     )
+
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_COLUMNS = ("email", "password", "name", "surname")
+
+# per-transaction staging table the imported rows are copied into
+user_import = Table(
+    "user_import",
+    MetaData(),
+    *(Column(name, User.__table__.c[name].type) for name in IMPORT_COLUMNS),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+async def _stage_rows(session: AsyncSession, rows: list):
+    """Function to load rows into the staging table, using COPY when the
+    driver supports it and a multi-row INSERT otherwise
+
+    Args:
+        session (AsyncSession): database session
+        rows (list): tuples of IMPORT_COLUMNS values
+    """
+    connection = await session.connection()
+    await connection.run_sync(user_import.create)
+    driver_connection = (await connection.get_raw_connection()).driver_connection
+    if hasattr(driver_connection, "copy_records_to_table"):
+        await driver_connection.copy_records_to_table(
+            user_import.name, records=rows, columns=IMPORT_COLUMNS
+        )
+    else:
+        await session.execute(
+            user_import.insert(), [dict(zip(IMPORT_COLUMNS, row)) for row in rows]
+        )
+
+
+async def _import_chunk(session: AsyncSession, number: int, rows: list, offset: int):
+    """Function to validate, hash, stage and merge one chunk of rows
+
+    Args:
+        session (AsyncSession): database session
+        number (int): chunk number
+        rows (list): raw user dictionaries
+        offset (int): index of the first row in the whole import
+
+    Returns:
+        dict: chunk report
+    """
+    start = time.perf_counter()
+    valid, invalid = [], []
+    for index, row in enumerate(rows, start=offset):
+        try:
+            valid.append(UserCreate.model_validate(row))
+        except ValidationError as exc:
+            # leave out the input, it may be a plaintext password
+            invalid.append(
+                {
+                    "row": index,
+                    "errors": [
+                        {key: error[key] for key in ("type", "loc", "msg")}
+                        for error in exc.errors(include_url=False)
+                    ],
+                }
+            )
+    hashes = await asyncio.gather(
+        *(SecurityManager.hash_async(user.password) for user in valid)
+    )
+    inserted, conflicts = 0, []
+    if valid:
+        await _stage_rows(
+            session,
+            [
+                (user.email, password, user.name, user.surname)
+                for user, password in zip(valid, hashes)
+            ],
+        )
+        staged = select(*user_import.c).distinct(user_import.c.email)
+        created = set(
+            await session.scalars(
+                insert(User)
+                .from_select(IMPORT_COLUMNS, staged)
+                .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+                .returning(User.email)
+            )
+        )
+        await session.commit()
+        inserted = len(created)
+        # rows whose email already existed or appeared earlier in the chunk
+        for user in valid:
+            if user.email in created:
+                created.discard(user.email)
+            else:
+                conflicts.append(user.email)
+    return {
+        "chunk": number,
+        "rows": len(rows),
+        "inserted": inserted,
+        "invalid": invalid,
+        "conflicts": conflicts,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+async def crud_import_users(
+    session: AsyncSession,
+    rows: Iterable[dict],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_chunk: Callable[[dict], None] = None,
+):
+    """CRUD function to bulk import users, every chunk is validated, hashed in
+    parallel, copied into a staging table and merged in its own transaction
+
+    Args:
+        session (AsyncSession): database session
+        rows (Iterable[dict]): raw user dictionaries, may be a lazy iterator
+        chunk_size (int, optional): rows per chunk. Defaults to IMPORT_CHUNK_SIZE.
+        on_chunk (Callable[[dict], None], optional): called with every chunk
+        report as progress. Defaults to None.
+
+    Returns:
+        dict: totals, throughput and the chunk reports
+    """
+    start = time.perf_counter()
+    rows, chunks, offset = iter(rows), [], 0
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        report = await _import_chunk(session, len(chunks) + 1, chunk, offset)
+        offset += len(chunk)
+        chunks.append(report)
+        if on_chunk:
+            on_chunk(report)
+    seconds = time.perf_counter() - start
+    return {
+        "rows": offset,
+        "inserted": sum(chunk["inserted"] for chunk in chunks),
+        "invalid": sum(len(chunk["invalid"]) for chunk in chunks),
+        "conflicts": sum(len(chunk["conflicts"]) for chunk in chunks),
+        "seconds": seconds,
+        "rows_per_second": offset / seconds if seconds else 0.0,
+        "chunks": chunks,
+    }
@@ -2,26 +2,271 @@
 Python Module for Handling Database connection via SQLAlchemy.
 """
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import time
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.metrics import (
+    CallbackGauge,
+    current_request,
+    db_statement_seconds,
+    pool_checkout_seconds,
+    registry,
+)
+from src.profiler import QueryProfiler
 from src.security import env_values
 
 
-engine = create_engine(env_values["DB_URI"], pool_size=0, max_overflow=-1)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def async_uri(uri: str):
+    """Function to point a database URI at the asyncpg driver
+
+    Args:
+        uri (str): database URI, e.g. postgresql://user:pw@host/db
+
+    Returns:
+        URL: URI using the postgresql+asyncpg driver
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool recording how long each checkout takes, including the
+    time spent waiting for a free connection
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - start)
+
+
+def _mark_idle(dbapi_connection, connection_record):  # pylint: disable=unused-argument
+    connection_record.info["idle_since"] = time.monotonic()
+
+
+def _ping_if_idle(
+    dbapi_connection, connection_record, connection_proxy
+):  # pylint: disable=unused-argument
+    """Function to check liveness of a connection on checkout, only when it
+    has been idle in the pool for longer than DB_POOL_PING_IDLE_SECONDS
+
+    Raises:
+        DisconnectionError: When the ping fails, the pool then discards the
+        connection and checks out a new one
+    """
+    idle_since = connection_record.info.pop("idle_since", None)
+    if not PRE_PING or idle_since is None:
+        return
+    if time.monotonic() - idle_since < PING_IDLE_SECONDS:
+        return
+    try:
+        dbapi_connection.ping()
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        raise DisconnectionError() from exc
+
+
+def _start_statement(
+    conn, cursor, statement, parameters, context, executemany
+):  # pylint: disable=unused-argument,too-many-arguments
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+def _end_statement(
+    conn, cursor, statement, parameters, context, executemany
+):  # pylint: disable=unused-argument,too-many-arguments
+    """Function to record the execution time of a statement, add it to the
+    database time of the current request and pass it to the query profiler
+    """
+    elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+    db_statement_seconds.observe(elapsed)
+    if (timer := current_request.get()) is not None:
+        timer.db_seconds += elapsed
+    if query_profiler is not None:
+        query_profiler.observe(
+            conn.engine, statement, None if executemany else parameters, elapsed
+        )
+
+
+def make_engine(uri: str):
+    """Function to create an engine with the configured connection pool
+
+    Args:
+        uri (str): database URI
+
+    Returns:
+        AsyncEngine: engine
+    """
+    new_engine = create_async_engine(
+        async_uri(uri),
+        poolclass=MeteredPool,
+        pool_size=int(env_values["DB_POOL_SIZE"]),
+        max_overflow=int(env_values["DB_MAX_OVERFLOW"]),
+        pool_timeout=float(env_values["DB_POOL_TIMEOUT"]),
+        pool_recycle=int(env_values["DB_POOL_RECYCLE"]),
+        # asyncpg prepares every statement server side once per connection
+        connect_args={
+            "prepared_statement_cache_size": int(
+                env_values.get("DB_PREPARED_STATEMENT_CACHE_SIZE", 500)
+            )
+        },
+    )
+    event.listen(new_engine.sync_engine.pool, "checkin", _mark_idle)
+    event.listen(new_engine.sync_engine.pool, "checkout", _ping_if_idle)
+    event.listen(new_engine.sync_engine, "before_cursor_execute", _start_statement)
+    event.listen(new_engine.sync_engine, "after_cursor_execute", _end_statement)
+    if query_profiler is not None:
+        query_profiler.attach(new_engine)
+    return new_engine
+
+
+def make_sessionmaker(bind: AsyncEngine):
+    """Function to create the session factory for an engine
+
+    Args:
+        bind (AsyncEngine): engine
+
+    Returns:
+        async_sessionmaker: session factory
+    """
+    return async_sessionmaker(
+        bind=bind, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+# statement statistics and slow query plans, off unless DB_PROFILE is set
+query_profiler = (
+    QueryProfiler(float(env_values.get("DB_SLOW_QUERY_MS", 100)) / 1000)
+    if env_values.get("DB_PROFILE", "").lower() in ("1", "true", "yes")
+    else None
+)
+engine = make_engine(env_values["DB_URI"])
+SessionLocal = make_sessionmaker(engine)
+# read-only replicas, used round-robin by db_read_session
+replica_engines = [
+    make_engine(uri.strip())
+    for uri in env_values.get("DB_REPLICA_URIS", "").split(",")
+    if uri.strip()
+]
+replica_sessions = itertools.cycle([make_sessionmaker(e) for e in replica_engines])
+PING_IDLE_SECONDS = float(env_values["DB_POOL_PING_IDLE_SECONDS"])
+PRE_PING = env_values["DB_POOL_PRE_PING"].lower() in ("1", "true", "yes")
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_YOUR_WRITES_SECONDS = float(env_values.get("DB_READ_YOUR_WRITES_SECONDS", 5))
 
 Base = declarative_base()
 
 
-def db_session():
+def pool_stats():
+    """Function to get live statistics of the engine connection pool
+
+    Returns:
+        dict: pool size, checked out, idle and overflow connections together
+        with the checkout latency histogram, and the same connection counts
+        for every replica pool
+    """
+    pool = engine.pool
+    checkout = pool_checkout_seconds.snapshot()
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": int(env_values["DB_MAX_OVERFLOW"]),
+        "timeout": pool.timeout(),
+        "wait_seconds_total": checkout["sum"],
+        "wait_seconds_max": checkout["max"],
+        "checkout_seconds": checkout,
+        "replicas": [
+            {
+                "size": replica.pool.size(),
+                "checked_out": replica.pool.checkedout(),
+                "idle": replica.pool.checkedin(),
+                "overflow": max(replica.pool.overflow(), 0),
+            }
+            for replica in replica_engines
+        ],
+    }
+
+
+registry.register(
+    CallbackGauge(
+        "db_pool_connections",
+        "Connections of the primary pool by state.",
+        lambda: {
+            "checked_out": engine.pool.checkedout(),
+            "idle": engine.pool.checkedin(),
+            "overflow": max(engine.pool.overflow(), 0),
+        },
+        "state",
+    )
+)
+
+
+async def db_session():
     """Function to create a new database session and close it after use.
 
     Yields:
-        Session: database session
+        AsyncSession: database session
     """
     session = SessionLocal()
     try:
-        session.execute(text("SELECT 1"))
         yield session
     finally:
-        session.close()
+        await session.close()
+
+
+async def db_write_session(response: Response, session=Depends(db_session)):
+    """Function to get a primary database session for a write, the client is
+    pinned to the primary for DB_READ_YOUR_WRITES_SECONDS so it reads its
+    own write even while replicas lag behind
+
+    Yields:
+        AsyncSession: primary database session
+    """
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        str(time.time() + READ_YOUR_WRITES_SECONDS),
+        max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+        httponly=True,
+    )
+    yield session
+
+
+async def db_read_session(request: Request, session=Depends(db_session)):
+    """Function to get a database session for read-only queries, replicas are
+    used round-robin unless none are configured or the client wrote recently
+
+    Yields:
+        AsyncSession: replica or primary database session, a replica session
+        has "replica" set in its info
+    """
+    try:
+        read_primary = float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        read_primary = False
+    if not replica_engines or read_primary:
+        yield session
+        return
+    replica = next(replica_sessions)()
+    replica.info["replica"] = True
+    try:
+        yield replica
+    finally:
+        await replica.close()
@@ -4,6 +4,7 @@ Module containing error handles for global handling
 from fastapi import Request  # pylint: disable=unused-argument
 from sqlalchemy.exc import OperationalError, ProgrammingError
 
+from src.health import DatabaseHealth
 from src.utils import respond
 
 
@@ -12,17 +13,21 @@ class CustomException(Exception):
     Custom exception class
     """
 
-    def __init__(self, status_code: int, message: str, detail: str = None):
+    def __init__(
+        self, status_code: int, message: str, detail: str = None, headers: dict = None
+    ):
         """Constructor method
 
         Args:
             status_code (int): status code
             message (str): message
             detail (str): detail
+            headers (dict, optional): response headers, e.g. Retry-After. Defaults to None.
         """
         self.status_code = status_code
         self.message = message
         self.detail = detail
+        self.headers = headers
 
 
 async def custom_exc(
@@ -37,7 +42,9 @@ async def custom_exc(
     Returns:
         JSONResponse: response
     """
-    return respond(error.status_code, error.detail, error.message)
+    response = respond(error.status_code, error.detail, error.message)
+    response.headers.update(error.headers or {})
+    return response
 
 
 async def operational_error_exc(
@@ -52,11 +59,27 @@ async def operational_error_exc(
     Returns:
         JSONResponse: response
     """
-    if "Connection refused" in str(error.orig):
+    if "Connection refused" in str(error.orig) or not DatabaseHealth.healthy:
         return respond(503, str(type(error.orig)), str(error.orig))
     return respond(500, str(type(error.orig)), str(error.orig))
 
 
+async def connection_error_exc(
+    request: Request, error: ConnectionError
+):  # pylint: disable=unused-argument
+    """Connection error handler, asyncpg raises these unwrapped when the
+    database can not be reached
+
+    Args:
+        request (Request): request
+        error (ConnectionError): error
+
+    Returns:
+        JSONResponse: response
+    """
+    return respond(503, str(type(error)), str(error))
+
+
 async def programming_error_exc(
     request: Request, error: ProgrammingError
 ):  # pylint: disable=unused-argument
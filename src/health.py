@@ -0,0 +1,73 @@
+"""
+Module containing the background database health prober
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHealth:  # pylint: disable=too-few-public-methods
+    """
+    Latest result of the background database probe
+    """
+
+    healthy: bool = True
+    error: str = None
+    checked_at: float = None
+
+    @classmethod
+    def report(cls, error: Exception = None):
+        """Function to record the outcome of a probe
+
+        Args:
+            error (Exception, optional): error raised by the probe. Defaults to None.
+        """
+        cls.healthy = error is None
+        cls.error = None if error is None else str(error) or type(error).__name__
+        cls.checked_at = time.time()
+
+
+async def probe_database(engine: AsyncEngine, timeout: float):
+    """Function to check once if the database accepts queries
+
+    Args:
+        engine (AsyncEngine): engine to probe
+        timeout (float): seconds to wait for the probe query
+
+    Returns:
+        bool: True if the database answered, False otherwise
+    """
+
+    async def select_one():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(select_one(), timeout)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        if DatabaseHealth.healthy:
+            logger.error("Database probe failed: %s", exc)
+        DatabaseHealth.report(exc)
+    else:
+        if not DatabaseHealth.healthy:
+            logger.info("Database probe recovered.")
+        DatabaseHealth.report()
+    return DatabaseHealth.healthy
+
+
+async def run_prober(engine: AsyncEngine, interval: float):
+    """Function to probe the database periodically until cancelled
+
+    Args:
+        engine (AsyncEngine): engine to probe
+        interval (float): seconds between probes
+    """
+    while True:
+        await probe_database(engine, interval)
+        await asyncio.sleep(interval)
@@ -0,0 +1,77 @@
+"""
+Command line bulk user import
+
+Usage:
+    python -m src.importer users.csv --chunk-size 5000
+
+Rows are read lazily from a CSV file with an email,password,name,surname
+header or from a JSON lines file (.jsonl), and imported with
+crud_import_users.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import pathlib
+
+from src.crud.user_crud import IMPORT_CHUNK_SIZE, crud_import_users
+from src.database import SessionLocal, engine
+
+
+def read_rows(path: pathlib.Path):
+    """Function to read user rows one at a time
+
+    Args:
+        path (pathlib.Path): CSV or JSON lines file
+
+    Yields:
+        dict: raw user data
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        if path.suffix in (".jsonl", ".ndjson"):
+            yield from (json.loads(line) for line in file if line.strip())
+        else:
+            yield from csv.DictReader(file)
+
+
+def print_progress(report: dict):
+    """Function to print the report of an imported chunk
+
+    Args:
+        report (dict): chunk report
+    """
+    print(
+        f"chunk {report['chunk']}: {report['rows']} rows, "
+        f"{report['inserted']} inserted, {len(report['invalid'])} invalid, "
+        f"{len(report['conflicts'])} conflicts in {report['seconds']:.2f}s"
+    )
+    for invalid in report["invalid"]:
+        print(f"  row {invalid['row']} invalid: {invalid['errors']}")
+    for email in report["conflicts"]:
+        print(f"  conflict: {email}")
+
+
+async def main(args: argparse.Namespace):
+    """Function to import a file and print the throughput report
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+    """
+    async with SessionLocal() as session:
+        report = await crud_import_users(
+            session, read_rows(args.path), args.chunk_size, print_progress
+        )
+    await engine.dispose()
+    print(
+        f"{report['rows']} rows, {report['inserted']} inserted, "
+        f"{report['invalid']} invalid, {report['conflicts']} conflicts "
+        f"in {report['seconds']:.2f}s ({report['rows_per_second']:.1f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import users")
+    parser.add_argument("path", type=pathlib.Path)
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,160 @@
+"""
+Module containing the JWT signing keys and the published JWKS
+
+Usage:
+    python -m src.keyring --dir keys --algorithm RS256
+
+generates a new signing key, which becomes the active one. Keep the older
+key files until every token they signed has expired, their public keys stay
+published in the JWKS so consumers can still verify those tokens.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import pathlib
+import secrets
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+
+ASYMMETRIC_ALGORITHMS = {"RS256": RSAAlgorithm, "EdDSA": OKPAlgorithm}
+
+
+class KeyRing:
+    """
+    Keys used to sign and verify JWT tokens
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret: str = None,
+        keys_dir: str = None,
+        active_kid: str = None,
+    ):
+        """Constructor method
+
+        Args:
+            algorithm (str): HS256, RS256 or EdDSA
+            secret (str, optional): shared secret for HS256. Defaults to None.
+            keys_dir (str, optional): directory of <kid>.pem private keys,
+            required by the asymmetric algorithms. Defaults to None.
+            active_kid (str, optional): kid to sign with, the most recently
+            modified key is used when empty. Defaults to None.
+
+        Raises:
+            ValueError: When the algorithm is unsupported, or the keys
+            directory is not set or has no keys
+        """
+        self.algorithm = algorithm
+        self.verifying_keys = {}
+        self.signing_key = secret
+        self.active_kid = None
+        jwks = []
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            if not keys_dir:
+                raise ValueError(f"JWT_KEYS_DIR is required for {algorithm}")
+            paths = sorted(
+                pathlib.Path(keys_dir).glob("*.pem"),
+                key=lambda path: (path.stat().st_mtime, path.name),
+            )
+            if not paths:
+                raise ValueError(f"No {algorithm} signing keys found in {keys_dir}")
+            private_keys = {
+                path.stem: serialization.load_pem_private_key(
+                    path.read_bytes(), password=None
+                )
+                for path in paths
+            }
+            self.active_kid = active_kid or paths[-1].stem
+            self.signing_key = private_keys[self.active_kid]
+            for kid, private_key in private_keys.items():
+                self.verifying_keys[kid] = private_key.public_key()
+                jwk = ASYMMETRIC_ALGORITHMS[algorithm].to_jwk(
+                    self.verifying_keys[kid], as_dict=True
+                )
+                jwks.append({**jwk, "kid": kid, "use": "sig", "alg": algorithm})
+        elif algorithm != "HS256":
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+        # the symmetric secret is never published
+        self.jwks = json.dumps({"keys": jwks}, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.sha256(self.jwks).hexdigest()[:32]}"'
+
+    def encode(self, payload: dict):
+        """Function to sign a JWT token with the active key
+
+        Args:
+            payload (dict): token claims
+
+        Returns:
+            str: JWT token
+        """
+        headers = {"kid": self.active_kid} if self.active_kid else None
+        return jwt.encode(
+            payload, self.signing_key, algorithm=self.algorithm, headers=headers
+        )
+
+    def decode(self, token: str):
+        """Function to verify a JWT token with the key named by its kid header
+
+        Args:
+            token (str): JWT token
+
+        Raises:
+            jwt.InvalidTokenError: When the token is invalid or the key unknown
+
+        Returns:
+            dict: Decoded JWT token
+        """
+        key = self.signing_key
+        if self.algorithm in ASYMMETRIC_ALGORITHMS:
+            kid = jwt.get_unverified_header(token).get("kid")
+            if (key := self.verifying_keys.get(kid)) is None:
+                raise jwt.InvalidTokenError(f"Unknown signing key {kid}")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+
+def generate_key(keys_dir: str, algorithm: str):
+    """Function to write a new private key, named after its kid
+
+    Args:
+        keys_dir (str): directory to store the key in
+        algorithm (str): RS256 or EdDSA
+
+    Returns:
+        pathlib.Path: path of the written key
+    """
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    kid = (
+        f"{datetime.datetime.now(tz=datetime.timezone.utc):%Y%m%d%H%M%S}"
+        f"-{secrets.token_hex(4)}"
+    )
+    path = pathlib.Path(keys_dir) / f"{kid}.pem"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    path.chmod(0o600)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a new JWT signing key")
+    parser.add_argument("--dir", default="keys")
+    parser.add_argument(
+        "--algorithm", choices=sorted(ASYMMETRIC_ALGORITHMS), default="RS256"
+    )
+    arguments = parser.parse_args()
+    print(generate_key(arguments.dir, arguments.algorithm))
@@ -0,0 +1,181 @@
+"""
+Module containing the non-blocking logging pipeline, records are put on a
+queue by the request handlers and written as JSON lines by a listener thread
+"""
+
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import zlib
+
+current_request_id = contextvars.ContextVar("current_request_id", default=None)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formatter rendering a record as a single line JSON object
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, tz=datetime.timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if (request_id := getattr(record, "request_id", None)) is not None:
+            entry["request_id"] = request_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):  # pylint: disable=too-few-public-methods
+    """
+    Filter tagging records with the current request ID and sampling the
+    records at INFO and below, the whole request is kept or dropped
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        """Constructor method
+
+        Args:
+            sample_rate (float, optional): share of requests whose INFO records
+            are kept, warnings and errors are always kept. Defaults to 1.0.
+        """
+        super().__init__()
+        self.threshold = int(sample_rate * 0xFFFFFFFF)
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id = current_request_id.get()
+        if record.levelno > logging.INFO or self.threshold >= 0xFFFFFFFF:
+            return True
+        # hash the request ID so every line of a request shares the decision,
+        # lines outside a request are never sampled out
+        if request_id is None or zlib.crc32(request_id.encode()) <= self.threshold:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler dropping records when the queue is full instead of
+    blocking the event loop or reporting an error
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        """Constructor method
+
+        Args:
+            log_queue (queue.Queue): bounded queue read by the listener
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # merge the arguments and traceback now, the listener formats the
+        # rest in its thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.args, record.exc_info = None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """
+    Queue listener waiting for room in a full queue to enqueue its stop
+    sentinel, so the records before it are still written
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """
+    Root logger configuration of the app, the listener thread is started and
+    stopped with the app
+    """
+
+    def __init__(
+        self,
+        level: str = "INFO",
+        sample_rate: float = 1.0,
+        queue_size: int = 10000,
+        stream=None,
+    ):
+        """Constructor method
+
+        Args:
+            level (str, optional): root logger level. Defaults to "INFO".
+            sample_rate (float, optional): share of requests whose INFO records
+            are kept. Defaults to 1.0.
+            queue_size (int, optional): records buffered before new ones are
+            dropped. Defaults to 10000.
+            stream (TextIO, optional): output stream. Defaults to stderr.
+        """
+        self.level = logging.getLevelName(level.upper())
+        if not isinstance(self.level, int):
+            raise ValueError(f"Unsupported log level: {level}")
+        self.queue = queue.Queue(queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.filter = RequestContextFilter(sample_rate)
+        self.handler.addFilter(self.filter)
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter())
+        self.listener = DrainingQueueListener(self.queue, output)
+
+    def install(self):
+        """
+        Function to make the queue handler the only handler of the root logger
+        """
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+
+    def start(self):
+        """
+        Function to start the listener thread
+        """
+        if self.listener._thread is None:  # pylint: disable=protected-access
+            self.listener.start()
+
+    def stop(self):
+        """
+        Function to write the queued records and stop the listener thread
+        """
+        if self.listener._thread is not None:  # pylint: disable=protected-access
+            self.listener.stop()
+
+    def stats(self):
+        """Function to get the pipeline counters
+
+        Returns:
+            dict: queued, dropped and sampled out records
+        """
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.filter.sampled_out,
+        }
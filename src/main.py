@@ -2,17 +2,43 @@
 Module to create the FastAPI app and add the routes and middlewares
 """
 
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import OperationalError, ProgrammingError
 from src.errors import (
+    connection_error_exc,
     operational_error_exc,
     programming_error_exc,
     custom_exc,
     CustomException,
 )
-from src.security import SecurityManager
-from src.routers import user_router, auth_router
+from src.crud.auth_crud import crud_get_revocations
+from src.database import engine
+from src.health import run_prober
+from src.logs import LogPipeline
+from src.metrics import CallbackGauge, registry
+from src.middleware import MetricsMiddleware, RequestIdMiddleware
+from src.revocation import run_refresher
+from src.security import SecurityManager, env_values, revoked_sessions
+from src.routers import user_router, auth_router, metrics_router
+from src.utils import FastJSONResponse
+
+log_pipeline = LogPipeline(
+    env_values.get("LOG_LEVEL", "INFO"),
+    float(env_values.get("LOG_SAMPLE_RATE", 1)),
+    int(env_values.get("LOG_QUEUE_SIZE", 10000)),
+)
+registry.register(
+    CallbackGauge(
+        "log_records",
+        "Records waiting in the log queue, dropped when it was full and sampled out.",
+        log_pipeline.stats,
+        "state",
+    )
+)
 
 
 def create_app():
@@ -22,11 +48,16 @@ def create_app():
         FastAPI: FastAPI app
     """
     SecurityManager.validate_env()
+    log_pipeline.install()
 
-    app = FastAPI()
+    app = FastAPI(default_response_class=FastJSONResponse)
 
     app.include_router(user_router.router)
     app.include_router(auth_router.router)
+    app.include_router(metrics_router.router)
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestIdMiddleware)
 
     # add CORS
     app.add_middleware(
@@ -40,8 +71,33 @@ def create_app():
     async def root():
         return {"message": "Online"}
 
+    @app.on_event("startup")
+    async def start_background_tasks():
+        log_pipeline.start()
+        app.state.tasks = [
+            asyncio.create_task(
+                run_prober(engine, float(env_values.get("DB_HEALTH_PROBE_SECONDS", 5)))
+            ),
+            asyncio.create_task(
+                run_refresher(
+                    revoked_sessions,
+                    crud_get_revocations,
+                    float(env_values.get("REVOCATION_REFRESH_SECONDS", 5)),
+                )
+            ),
+        ]
+
+    @app.on_event("shutdown")
+    async def stop_background_tasks():
+        for task in app.state.tasks:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        log_pipeline.stop()
+
     app.add_exception_handler(OperationalError, operational_error_exc)
     app.add_exception_handler(ProgrammingError, programming_error_exc)
+    app.add_exception_handler(ConnectionError, connection_error_exc)
     app.add_exception_handler(CustomException, custom_exc)
 
     return app
@@ -0,0 +1,307 @@
+"""
+Module containing in-process metric primitives and their registry, rendered
+in the Prometheus text format
+"""
+
+import bisect
+import contextvars
+import threading
+from typing import Callable
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket upper bounds
+    """
+
+    def __init__(self, buckets: tuple):
+        """Constructor method
+
+        Args:
+            buckets (tuple): sorted bucket upper bounds
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Function to record a single observation
+
+        Args:
+            value (float): observed value
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            self.max = max(self.max, value)
+
+    def snapshot(self):
+        """Function to get the current state of the histogram
+
+        Returns:
+            dict: cumulative bucket counts, sum, count and max
+        """
+        with self._lock:
+            counts = list(self.counts)
+            snapshot = {"sum": self.total, "count": self.count, "max": self.max}
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        snapshot["buckets"] = buckets
+        return snapshot
+
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def _labels(names: tuple, values: tuple, extra: str = ""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class HistogramFamily:
+    """
+    Histograms of one metric keyed by label values
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets=None):
+        """Constructor method
+
+        Args:
+            name (str): metric name
+            help_text (str): metric description
+            labels (tuple, optional): label names. Defaults to ().
+            buckets (tuple, optional): bucket upper bounds. Defaults to LATENCY_BUCKETS.
+        """
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets or LATENCY_BUCKETS
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def child(self, *values):
+        """Function to get the histogram of a label value combination
+
+        Returns:
+            Histogram: histogram
+        """
+        if (histogram := self._children.get(values)) is None:
+            with self._lock:
+                histogram = self._children.setdefault(values, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, value: float, *values):
+        """Function to record a single observation
+
+        Args:
+            value (float): observed value
+            *values: label values
+        """
+        self.child(*values).observe(value)
+
+    def samples(self):
+        """Function to get the Prometheus samples of the family
+
+        Yields:
+            str: sample line
+        """
+        for values, histogram in list(self._children.items()):
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                labels = _labels(self.labels, values, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _labels(self.labels, values)
+            yield f"{self.name}_sum{labels} {snapshot['sum']}"
+            yield f"{self.name}_count{labels} {snapshot['count']}"
+
+
+class Gauge:
+    """
+    Value that goes up and down, keyed by label values
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        """Constructor method
+
+        Args:
+            name (str): metric name
+            help_text (str): metric description
+            labels (tuple, optional): label names. Defaults to ().
+        """
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, amount: float, *values):
+        """Function to change the value
+
+        Args:
+            amount (float): amount to add, negative to subtract
+            *values: label values
+        """
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def samples(self):
+        """Function to get the Prometheus samples of the gauge
+
+        Yields:
+            str: sample line
+        """
+        for values, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, values)} {value}"
+
+
+class CallbackGauge:  # pylint: disable=too-few-public-methods
+    """
+    Gauges read from a callback when the metrics are collected
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable, label: str):
+        """Constructor method
+
+        Args:
+            name (str): metric name
+            help_text (str): metric description
+            callback (Callable): function returning a dict of label value to value
+            label (str): label name of the dict keys
+        """
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.label = label
+
+    def samples(self):
+        """Function to get the Prometheus samples of the gauge
+
+        Yields:
+            str: sample line
+        """
+        for key, value in self.callback().items():
+            yield f'{self.name}{{{self.label}="{key}"}} {value}'
+
+
+class Registry:
+    """
+    Metrics exposed by the /metrics endpoint
+    """
+
+    def __init__(self):
+        """
+        Constructor method
+        """
+        self.metrics = []
+
+    def register(self, metric):
+        """Function to add a metric
+
+        Args:
+            metric (HistogramFamily | Gauge | CallbackGauge): metric
+
+        Returns:
+            HistogramFamily | Gauge | CallbackGauge: the metric
+        """
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Function to render every metric in the Prometheus text format
+
+        Returns:
+            str: exposition text
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:  # pylint: disable=too-few-public-methods
+    """
+    Time spent by the current request in the database
+    """
+
+    __slots__ = ("db_seconds",)
+
+    def __init__(self):
+        """
+        Constructor method
+        """
+        self.db_seconds = 0.0
+
+
+# set by the metrics middleware, read by the database cursor events
+current_request = contextvars.ContextVar("current_request", default=None)
+
+registry = Registry()
+pool_checkout_seconds = registry.register(
+    HistogramFamily(
+        "db_pool_checkout_seconds",
+        "Time to check a connection out of the pool, including waiting.",
+    )
+).child()
+http_request_seconds = registry.register(
+    HistogramFamily(
+        "http_request_duration_seconds",
+        "Time to answer a request.",
+        ("method", "route", "status"),
+    )
+)
+http_request_db_seconds = registry.register(
+    HistogramFamily(
+        "http_request_db_seconds",
+        "Time a request spent executing database statements.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "Requests being answered.", ("method",))
+)
+db_statement_seconds = registry.register(
+    HistogramFamily("db_statement_seconds", "Time to execute a database statement.")
+)
+hash_seconds = registry.register(
+    HistogramFamily(
+        "password_hash_seconds",
+        "Time to hash or verify a password, including the executor queue.",
+        ("operation",),
+    )
+)
+jwt_seconds = registry.register(
+    HistogramFamily(
+        "jwt_seconds", "Time to sign or verify a JWT token.", ("operation",)
+    )
+)
@@ -0,0 +1,103 @@
+"""
+Module containing the ASGI middlewares
+"""
+
+import time
+import uuid
+
+from src.logs import current_request_id
+from src.metrics import (
+    RequestTimer,
+    current_request,
+    http_request_db_seconds,
+    http_request_seconds,
+    http_requests_in_flight,
+)
+
+
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Middleware recording latency, status and database time of every request
+    by route template
+    """
+
+    def __init__(self, app):
+        """Constructor method
+
+        Args:
+            app (ASGIApp): wrapped application
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timer = RequestTimer()
+        token = current_request.set(timer)
+        http_requests_in_flight.add(1, method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            # the router stores the matched route in the scope, raw paths
+            # would give every user ID its own series
+            route = route.path if (route := scope.get("route")) else "unmatched"
+            http_request_seconds.observe(elapsed, method, route, str(status))
+            http_request_db_seconds.observe(timer.db_seconds, method, route)
+            http_requests_in_flight.add(-1, method)
+            current_request.reset(token)
+
+
+class RequestIdMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Middleware giving every request an ID for its log records, taken from the
+    X-Request-ID header when the client sends one and echoed in the response
+    """
+
+    HEADER = b"x-request-id"
+    MAX_LENGTH = 128
+
+    def __init__(self, app):
+        """Constructor method
+
+        Args:
+            app (ASGIApp): wrapped application
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.HEADER and 0 < len(value) <= self.MAX_LENGTH:
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (self.HEADER, request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_request_id.reset(token)
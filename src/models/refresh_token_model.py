@@ -0,0 +1,33 @@
+"""
+Module containing models for the refresh token model
+"""
+
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from src.database import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh token table, one row per login session
+    """
+
+    __tablename__ = "refresh_token"
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    # session ID, carried by access tokens as the sid claim
+    sid = Column(String(32), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    # sha256 of the current refresh token, the token itself is never stored
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+    # revocations are read incrementally by revoked_at
+    __table_args__ = (
+        Index(
+            "ix_refresh_token_revoked_at",
+            revoked_at,
+            postgresql_where=revoked_at.isnot(None),
+        ),
+    )
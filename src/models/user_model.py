@@ -3,7 +3,7 @@ Module containing models for the user model
 """
 
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String, func
 from src.database import Base
 
 
@@ -15,7 +15,32 @@ class User(Base):
     __tablename__ = "user"
 
     id = Column(Integer, primary_key=True, nullable=False)
-    email = Column(String(80), unique=True, nullable=False)
-    password = Column(String(80), nullable=False)
+    # unique through uq_user_email_lower, emails are stored lower-cased
+    email = Column(String(80), nullable=False)
+    password = Column(String(255), nullable=False)
     name = Column(String(20), nullable=True)
     surname = Column(String(20), nullable=True)
+    # bumped on every ORM update, stale updates raise StaleDataError
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+    # case-insensitive lookups and prefix search, text_pattern_ops lets
+    # LIKE 'abc%' use the index whatever the database collation is
+    __table_args__ = (
+        Index(
+            "uq_user_email_lower",
+            func.lower(email).label("email_lower"),
+            unique=True,
+            postgresql_ops={"email_lower": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_user_name_lower",
+            func.lower(name).label("name_lower"),
+            postgresql_ops={"name_lower": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_user_surname_lower",
+            func.lower(surname).label("surname_lower"),
+            postgresql_ops={"surname_lower": "text_pattern_ops"},
+        ),
+    )
@@ -0,0 +1,227 @@
+"""
+Module containing the opt-in query profiler, statements are grouped by
+fingerprint and the slow ones are logged together with their plan
+"""
+
+import asyncio
+import collections
+import logging
+import math
+import re
+import time
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+(?:::\w+)?|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\?(?:, \?)+\)")
+_ROWS = re.compile(r"\(\?, \.\.\.\)(?:, \(\?, \.\.\.\))+")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def fingerprint(statement: str):
+    """Function to normalise a statement so that the executions differing
+    only in parameters, literals or the length of IN and VALUES lists match
+
+    Args:
+        statement (str): SQL statement as sent to the driver
+
+    Returns:
+        str: statement fingerprint
+    """
+    statement = _LITERALS.sub("?", _WHITESPACE.sub(" ", statement).strip())
+    return _ROWS.sub("(?, ...), ...", _LISTS.sub("(?, ...)", statement))
+
+
+class StatementStats:
+    """
+    Executions of a single statement fingerprint
+    """
+
+    __slots__ = ("count", "total", "max", "recent", "plan")
+
+    def __init__(self, window: int):
+        """Constructor method
+
+        Args:
+            window (int): number of recent durations kept for the percentiles
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+        self.plan = None
+
+    def observe(self, elapsed: float):
+        """Function to record a single execution
+
+        Args:
+            elapsed (float): execution time in seconds
+        """
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.recent.append(elapsed)
+
+    def percentile(self, share: float):
+        """Function to get a percentile of the recent durations
+
+        Args:
+            share (float): percentile between 0 and 1, e.g. 0.99
+
+        Returns:
+            float: duration in seconds
+        """
+        durations = sorted(self.recent)
+        return durations[max(math.ceil(share * len(durations)) - 1, 0)]
+
+
+class QueryProfiler:  # pylint: disable=too-many-instance-attributes
+    """
+    Statement statistics of the attached engines, the durations come from
+    the statement timing of src.database, statements slower than the
+    threshold are logged with a plan read over a separate connection once
+    the statement has finished
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_statements: int = 1000,
+        window: int = 1000,
+        explain_interval: float = 60,
+    ):
+        """Constructor method
+
+        Args:
+            threshold (float): seconds after which a statement is slow
+            max_statements (int, optional): fingerprints tracked, later ones
+            are only counted as untracked. Defaults to 1000.
+            window (int, optional): recent durations kept per fingerprint for
+            the p99. Defaults to 1000.
+            explain_interval (float, optional): minimum seconds between two
+            plans of the same fingerprint. Defaults to 60.
+        """
+        self.threshold = threshold
+        self.max_statements = max_statements
+        self.window = window
+        self.explain_interval = explain_interval
+        self.statements = {}
+        self.untracked = 0
+        self._engines = {}
+        self._explained_at = {}
+        self._tasks = set()
+
+    def attach(self, engine: AsyncEngine):
+        """Function to profile the statements executed by an engine
+
+        Args:
+            engine (AsyncEngine): engine to profile
+        """
+        self._engines[engine.sync_engine] = engine
+
+    def observe(self, sync_engine: Engine, statement: str, parameters, elapsed: float):
+        """Function to record an execution timed by a cursor event, ignored
+        unless the engine is attached
+
+        Args:
+            sync_engine (Engine): engine of the cursor event
+            statement (str): SQL statement
+            parameters (tuple | None): driver parameters, None for executemany
+            elapsed (float): execution time in seconds
+        """
+        if (engine := self._engines.get(sync_engine)) is not None:
+            self.record(engine, statement, parameters, elapsed)
+
+    def record(self, engine: AsyncEngine, statement: str, parameters, elapsed: float):
+        """Function to record an execution and explain it when it was slow
+
+        Args:
+            engine (AsyncEngine): engine which executed the statement
+            statement (str): SQL statement
+            parameters (tuple | None): driver parameters, None for executemany
+            elapsed (float): execution time in seconds
+        """
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        key = fingerprint(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                self.untracked += 1
+                return
+            stats = self.statements[key] = StatementStats(self.window)
+        stats.observe(elapsed)
+        if elapsed < self.threshold:
+            return
+        logger.warning("Slow query %.1f ms: %s", elapsed * 1000, key)
+        now = time.monotonic()
+        if (
+            parameters is None
+            or not key.startswith(EXPLAINABLE)
+            or now - self._explained_at.get(key, -math.inf) < self.explain_interval
+        ):
+            return
+        self._explained_at[key] = now
+        task = asyncio.get_running_loop().create_task(
+            self.explain(engine, key, statement, parameters)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def explain(self, engine: AsyncEngine, key: str, statement: str, parameters):
+        """Function to read and log the plan of a slow statement, without
+        ANALYZE so that the statement is not run again
+
+        Args:
+            engine (AsyncEngine): engine which executed the statement
+            key (str): statement fingerprint
+            statement (str): SQL statement
+            parameters (tuple): driver parameters of the slow execution
+        """
+        try:
+            async with engine.connect() as conn:
+                result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                plan = "\n".join(row[0] for row in result)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning("Explaining slow query failed: %s", exc)
+            return
+        if key in self.statements:
+            self.statements[key].plan = plan
+        logger.warning("Plan of slow query %s\n%s", key, plan)
+
+    def top(self, limit: int = 10, order: str = "total"):
+        """Function to get the statements with the highest cost
+
+        Args:
+            limit (int, optional): number of statements. Defaults to 10.
+            order (str, optional): total, count, p99 or max. Defaults to "total".
+
+        Returns:
+            List[dict]: statement statistics, most expensive first
+        """
+        rows = [
+            {
+                "statement": key,
+                "count": stats.count,
+                "total": stats.total,
+                "mean": stats.total / stats.count,
+                "p99": stats.percentile(0.99),
+                "max": stats.max,
+                "plan": stats.plan,
+            }
+            for key, stats in list(self.statements.items())
+        ]
+        rows.sort(key=lambda row: row[order], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        """
+        Function to forget every statement
+        """
+        self.statements.clear()
+        self._explained_at.clear()
+        self.untracked = 0
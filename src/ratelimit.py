@@ -0,0 +1,194 @@
+"""
+Module containing the token bucket rate limiter and its backends
+"""
+
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBucketStore:
+    """
+    Token buckets kept in process, the least recently used buckets are
+    dropped when max_keys is reached, which refills them
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        """Constructor method
+
+        Args:
+            max_keys (int, optional): maximum number of buckets kept. Defaults to 100000.
+        """
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float):
+        """Function to refill a bucket and take tokens from it
+
+        Args:
+            key (str): bucket key
+            capacity (float): maximum number of tokens
+            rate (float): tokens added per second
+            cost (float): tokens to take, 0 only checks the bucket is not empty
+
+        Returns:
+            Tuple[bool, float]: True if allowed and the tokens left
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        allowed = tokens >= max(cost, 1)
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def clear(self):
+        """
+        Function to drop every bucket
+        """
+        self._buckets.clear()
+
+
+class RedisBucketStore:  # pylint: disable=too-few-public-methods
+    """
+    Token buckets stored in Redis and shared by every instance, requires the
+    optional redis package
+    """
+
+    # refill and take atomically, buckets expire once they would be full again
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+    local allowed = 0
+    if tokens >= math.max(cost, 1) then
+        allowed = 1
+        tokens = tokens - cost
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        """Constructor method
+
+        Args:
+            url (str): Redis URL, e.g. redis://localhost:6379/0
+        """
+        import redis.asyncio  # pylint: disable=import-outside-toplevel,import-error
+
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float):
+        """Function to refill a bucket and take tokens from it
+
+        Args:
+            key (str): bucket key
+            capacity (float): maximum number of tokens
+            rate (float): tokens added per second
+            cost (float): tokens to take, 0 only checks the bucket is not empty
+
+        Returns:
+            Tuple[bool, float]: True if allowed and the tokens left
+        """
+        allowed, tokens = await self._script(
+            keys=[key], args=[capacity, rate, time.time(), cost]
+        )
+        return bool(allowed), float(tokens)
+
+
+class RateLimiter:
+    """
+    Token bucket limiter, a key may spend limit tokens per period
+    """
+
+    def __init__(self, name: str, store, limit: int, period: float):
+        """Constructor method
+
+        Args:
+            name (str): namespace of the bucket keys
+            store (MemoryBucketStore | RedisBucketStore): bucket backend
+            limit (int): bucket capacity
+            period (float): seconds to refill an empty bucket
+        """
+        self.name = name
+        self.store = store
+        self.limit = limit
+        self.period = period
+        self.allowed = 0
+        self.rejected = 0
+
+    async def hit(self, key: str, cost: float = 1):
+        """Function to spend tokens of a key, backend errors allow the request
+
+        Args:
+            key (str): limited key, e.g. client IP
+            cost (float, optional): tokens to spend, 0 only checks. Defaults to 1.
+
+        Returns:
+            float: 0 if allowed, otherwise seconds until a token is available
+        """
+        rate = self.limit / self.period
+        try:
+            allowed, tokens = await self.store.take(
+                f"{self.name}:{key}", self.limit, rate, cost
+            )
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning("Rate limiter %s failed: %s", self.name, exc)
+            return 0
+        if allowed:
+            self.allowed += 1
+            return 0
+        self.rejected += 1
+        return (max(cost, 1) - tokens) / rate
+
+    def reset(self):
+        """
+        Function to reset the counters
+        """
+        self.allowed = self.rejected = 0
+
+    def stats(self):
+        """Function to get the limiter counters
+
+        Returns:
+            dict: limit, period, allowed and rejected hits
+        """
+        return {
+            "limit": self.limit,
+            "period": self.period,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+def bucket_store(name: str, url: str = None):
+    """Function to create the configured bucket backend
+
+    Args:
+        name (str): memory or redis
+        url (str, optional): backend URL. Defaults to None.
+
+    Raises:
+        ValueError: When the backend is unknown
+
+    Returns:
+        MemoryBucketStore | RedisBucketStore: bucket backend
+    """
+    if name == "memory":
+        return MemoryBucketStore()
+    if name == "redis":
+        return RedisBucketStore(url)
+    raise ValueError(f"Unsupported rate limit backend: {name}")
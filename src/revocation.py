@@ -0,0 +1,158 @@
+"""
+Module containing the in-process list of revoked login sessions
+"""
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed size set membership filter without false negatives
+    """
+
+    def __init__(self, size: int, hashes: int = 4):
+        """Constructor method
+
+        Args:
+            size (int): number of bits
+            hashes (int, optional): number of bit positions per key. Defaults to 4.
+        """
+        self.size = size
+        self.hashes = hashes
+        self._bits = bytearray((size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = (
+            int.from_bytes(digest[:8], "big"),
+            int.from_bytes(digest[8:], "big") | 1,
+        )
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        """Function to add a key
+
+        Args:
+            key (str): key to add
+        """
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationList:
+    """
+    Revoked session IDs, a bloom filter answers the common not revoked case
+    and an exact set rules out its false positives
+    """
+
+    # revoked_at is the start of the revoking transaction, which may commit
+    # after a later one, refreshes re-read this far behind the watermark
+    OVERLAP = datetime.timedelta(seconds=60)
+
+    def __init__(self, retention: float, bloom_bits: int = 1 << 16):
+        """Constructor method
+
+        Args:
+            retention (float): seconds a revocation is kept, at least the
+            lifetime of the access tokens issued for the session
+            bloom_bits (int, optional): size of the bloom filter. Defaults to 65536.
+        """
+        self.retention = retention
+        self.bloom_bits = bloom_bits
+        self.bloom = BloomFilter(bloom_bits)
+        self._revoked = {}
+        # revoked_at of the newest revocation read from the database
+        self.watermark = None
+
+    def add(self, sid: str, revoked_at: float = None):
+        """Function to mark a session as revoked
+
+        Args:
+            sid (str): session ID
+            revoked_at (float, optional): unix time of the revocation. Defaults to now.
+        """
+        self._revoked[sid] = time.time() if revoked_at is None else revoked_at
+        self.bloom.add(sid)
+
+    def __contains__(self, sid: str):
+        return sid in self.bloom and sid in self._revoked
+
+    def prune(self):
+        """
+        Function to forget revocations older than the retention, the bloom
+        filter is rebuilt from the remaining ones
+        """
+        cutoff = time.time() - self.retention
+        self._revoked = {
+            sid: revoked_at
+            for sid, revoked_at in self._revoked.items()
+            if revoked_at > cutoff
+        }
+        self.bloom = BloomFilter(self.bloom_bits)
+        for sid in self._revoked:
+            self.bloom.add(sid)
+
+    async def refresh(self, fetch: Callable[[datetime.datetime], Awaitable[list]]):
+        """Function to load the revocations made since the last refresh
+
+        Args:
+            fetch (Callable): coroutine function returning the (sid, revoked_at)
+            rows revoked at or after the given time, ordered by revoked_at
+
+        Returns:
+            int: number of revocations read
+        """
+        if self.watermark is not None:
+            since = self.watermark - self.OVERLAP
+        else:
+            since = datetime.datetime.fromtimestamp(
+                time.time() - self.retention, tz=datetime.timezone.utc
+            )
+        rows = await fetch(since)
+        for sid, revoked_at in rows:
+            self.add(sid, revoked_at.timestamp())
+        if rows:
+            self.watermark = rows[-1][1]
+        self.prune()
+        return len(rows)
+
+    def stats(self):
+        """Function to get the size of the list
+
+        Returns:
+            dict: number of revoked sessions and the watermark
+        """
+        return {
+            "revoked": len(self._revoked),
+            "bloom_bits": self.bloom_bits,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }
+
+
+async def run_refresher(revoked: RevocationList, fetch: Callable, interval: float):
+    """Function to refresh a revocation list periodically until cancelled
+
+    Args:
+        revoked (RevocationList): list to refresh
+        fetch (Callable): coroutine function passed to RevocationList.refresh
+        interval (float): seconds between refreshes
+    """
+    while True:
+        try:
+            await revoked.refresh(fetch)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.error("Revocation list refresh failed: %s", exc)
+        await asyncio.sleep(interval)
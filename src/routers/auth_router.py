@@ -3,29 +3,88 @@ Module containing the routes authorization
 """
 import logging
 
-from fastapi import APIRouter, Depends, status
-from src.database import db_session
-from src.crud.auth_crud import crud_login
-from sqlalchemy.orm import Session
-from src.security import SecurityManager
-from src.schemas.auth_schema import TokenSchema, LoginSchema
+from fastapi import APIRouter, Depends, Header, Request, Response, status
+from src.database import db_read_session, db_session
+from src.crud.auth_crud import (
+    check_login_rate,
+    crud_login,
+    crud_logout,
+    crud_refresh,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.security import SecurityManager, keyring
+from src.utils import etag_matches
+from src.schemas.auth_schema import (
+    RefreshSchema,
+    TokenBatchSchema,
+    TokenBatchVerdictSchema,
+    TokenPairSchema,
+    TokenSchema,
+    LoginSchema,
+)
 from src.utils import respond
 
 
 router = APIRouter(prefix="/auth", tags=["Authorization"])
+logger = logging.getLogger(__name__)
 
 
-@router.post("/login", response_model=TokenSchema, status_code=status.HTTP_200_OK)
-async def login(request_body: LoginSchema, session: Session = Depends(db_session)):
-    logging.info("REQUEST: login")
-    response = await crud_login(session, request_body)
-    logging.info("Login successful.")
+@router.post("/login", response_model=TokenPairSchema, status_code=status.HTTP_200_OK)
+async def login(
+    request: Request,
+    request_body: LoginSchema,
+    session: AsyncSession = Depends(db_read_session),
+    primary_session: AsyncSession = Depends(db_session),
+):
+    logger.info("REQUEST: login")
+    # sessions connect lazily, a rejected attempt never reaches the database
+    client_ip = request.client.host if request.client else None
+    await check_login_rate(client_ip, request_body.email)
+    response = await crud_login(session, request_body, primary_session)
+    logger.info("Login successful.")
     return response
 
 
+@router.post("/refresh", response_model=TokenPairSchema, status_code=status.HTTP_200_OK)
+async def refresh(
+    request_body: RefreshSchema, session: AsyncSession = Depends(db_session)
+):
+    logger.info("REQUEST: refresh")
+    response = await crud_refresh(session, request_body)
+    logger.info("Refresh successful.")
+    return response
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(
+    request_body: RefreshSchema, session: AsyncSession = Depends(db_session)
+):
+    logger.info("REQUEST: logout")
+    await crud_logout(session, request_body)
+    return respond(200, "Session has ended.", "Logged out", "info")
+
+
 @router.post("/", status_code=status.HTTP_200_OK)
 async def authenticate(request_body: TokenSchema):
-    logging.info("REQUEST: authenticate")
+    logger.info("REQUEST: authenticate")
     await SecurityManager.authenticate(request_body.model_dump()["access_token"])
-    logging.info("Authentication successful.")
+    logger.info("Authentication successful.")
     return respond(200, "User is authenticated succesfully.", "Authenticated", "info")
+
+
+@router.post(
+    "/batch", response_model=TokenBatchVerdictSchema, status_code=status.HTTP_200_OK
+)
+async def authenticate_batch(request_body: TokenBatchSchema):
+    logger.info("REQUEST: authenticate batch of %s", len(request_body.access_tokens))
+    results = await SecurityManager.authenticate_many(request_body.access_tokens)
+    logger.info("Batch authentication finished.")
+    return {"results": results}
+
+
+@router.get("/.well-known/jwks.json", status_code=status.HTTP_200_OK)
+async def jwks(if_none_match: str = Header(None)):
+    headers = {"ETag": keyring.etag, "Cache-Control": "public, max-age=300"}
+    if etag_matches(if_none_match, keyring.etag, weak=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(keyring.jwks, media_type="application/json", headers=headers)
@@ -0,0 +1,86 @@
+"""
+Module containing the routes exposing runtime metrics
+"""
+
+from typing import Literal
+
+from fastapi import APIRouter, Query, Response, status
+
+from src.crud.auth_crud import login_email_limiter, login_ip_limiter
+from src.crud.user_crud import user_cache
+from src.database import pool_stats, query_profiler
+from src.errors import CustomException
+from src.metrics import registry
+from src.security import revoked_sessions, token_cache
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def get_metrics():
+    return Response(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def get_pool_metrics():
+    return pool_stats()
+
+
+@router.get("/token-cache", status_code=status.HTTP_200_OK)
+async def get_token_cache_metrics():
+    return token_cache.stats()
+
+
+@router.get("/user-cache", status_code=status.HTTP_200_OK)
+async def get_user_cache_metrics():
+    return user_cache.stats()
+
+
+@router.get("/revocations", status_code=status.HTTP_200_OK)
+async def get_revocation_metrics():
+    return revoked_sessions.stats()
+
+
+@router.get("/rate-limit", status_code=status.HTTP_200_OK)
+async def get_rate_limit_metrics():
+    return {
+        "login_ip": login_ip_limiter.stats(),
+        "login_email": login_email_limiter.stats(),
+    }
+
+
+def enabled_profiler():
+    """Function to get the query profiler
+
+    Raises:
+        CustomException: When profiling is disabled
+
+    Returns:
+        QueryProfiler: query profiler
+    """
+    if query_profiler is None:
+        raise CustomException(
+            404, "Resource not found", "Query profiling is disabled, set DB_PROFILE."
+        )
+    return query_profiler
+
+
+@router.get("/queries", status_code=status.HTTP_200_OK)
+async def get_query_metrics(
+    limit: int = Query(10, ge=1, le=1000),
+    order: Literal["total", "count", "mean", "p99", "max"] = "total",
+):
+    profiler = enabled_profiler()
+    return {
+        "threshold": profiler.threshold,
+        "untracked": profiler.untracked,
+        "statements": profiler.top(limit, order),
+    }
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_query_metrics():
+    enabled_profiler().reset()
@@ -2,64 +2,146 @@
 Module containing the routes for the user model
 """
 
+import hashlib
 import logging
 from typing import List
 
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+import pydantic_core
+
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.crud.user_crud import (
     crud_create_user,
     crud_change_password,
     crud_get_user_by_id,
+    crud_get_user_version,
     crud_get_all_users,
+    crud_import_users,
+    crud_stream_users,
     crud_update_user,
+    decode_cursor,
+    IMPORT_CHUNK_SIZE,
+    PAGE_LIMIT_DEFAULT,
+    PAGE_LIMIT_MAX,
 )
-from src.database import db_session
+from src.database import db_read_session, db_write_session
 from src.schemas.user_schema import UserCreate, UserGet, UserChangePassword, UserUpdate
+from src.utils import FastJSONResponse, dump_trusted, etag_matches, make_etag
 
 router = APIRouter(prefix="/user", tags=["User"])
+logger = logging.getLogger(__name__)
 
 
 @router.post("/", response_model=UserGet, status_code=status.HTTP_201_CREATED)
-async def crate_user(request_body: UserCreate, session: Session = Depends(db_session)):
-    logging.info("REQUEST: create user")
+async def crate_user(
+    request_body: UserCreate, session: AsyncSession = Depends(db_write_session)
+):
+    logger.info("REQUEST: create user")
     response = await crud_create_user(session, request_body)
-    logging.info("User created successfully.")
+    logger.info("User created successfully.")
+    return response
+
+
+@router.post("/import", status_code=status.HTTP_200_OK)
+async def import_users(
+    request_body: List[dict] = Body(...),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    session: AsyncSession = Depends(db_write_session),
+):
+    logger.info("REQUEST: import %s users", len(request_body))
+    response = await crud_import_users(session, request_body, chunk_size)
+    logger.info(
+        "Imported %s users, %s invalid, %s conflicts.",
+        response["inserted"],
+        response["invalid"],
+        response["conflicts"],
+    )
     return response
 
 
 @router.put("/change-password", response_model=UserGet, status_code=status.HTTP_200_OK)
 async def patch_password(
-    request_body: UserChangePassword, session: Session = Depends(db_session)
+    request_body: UserChangePassword, session: AsyncSession = Depends(db_write_session)
 ):
-    logging.info("REQUEST: change password")
+    logger.info("REQUEST: change password")
     response = await crud_change_password(session, request_body)
-    logging.info("Password changed successfully.")
+    logger.info("Password changed successfully.")
     return response
 
 
 @router.get("/", response_model=List[UserGet], status_code=status.HTTP_200_OK)
-async def get_all_users(session=Depends(db_session)):
-    logging.info("REQUEST: change password")
-    response = await crud_get_all_users(session)
-    logging.info("Data fetched successfully.")
-    return response
+async def get_all_users(
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+    cursor: str = None,
+    stream: bool = False,
+    email: str = Query(None, max_length=80, description="Case-insensitive prefix"),
+    name: str = Query(None, max_length=20, description="Case-insensitive prefix"),
+    surname: str = Query(None, max_length=20, description="Case-insensitive prefix"),
+    if_none_match: str = Header(None),
+    session=Depends(db_read_session),
+):
+    logger.info("REQUEST: get all users")
+    filters = {"email": email, "name": name, "surname": surname}
+    if stream:
+        # validate up front, errors can not be reported once streaming began
+        decode_cursor(cursor)
+        # the session is closed after the body is sent, see the fastapi pin
+        return StreamingResponse(
+            (
+                pydantic_core.to_json(dump_trusted(UserGet, user)) + b"\n"
+                async for user in crud_stream_users(session, cursor, filters)
+            ),
+            media_type="application/x-ndjson",
+        )
+    users, next_cursor = await crud_get_all_users(session, limit, cursor, filters)
+    versions = ",".join(f"{user.id}.{user.version}" for user in users)
+    etag = make_etag(hashlib.sha256(f"{versions};{next_cursor}".encode()).hexdigest())
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    logger.info("Data fetched successfully.")
+    # rows come straight from the database, skip validating them again
+    return FastJSONResponse(
+        [dump_trusted(UserGet, user) for user in users], headers=headers
+    )
 
 
 @router.get("/{user_id}", response_model=UserGet, status_code=status.HTTP_200_OK)
-async def get_user_by_id(user_id: int, session=Depends(db_session)):
-    logging.info("REQUEST: get user by ID")
-    response = await crud_get_user_by_id(session, user_id)
-    logging.info("Data fetched successfully.")
-    return response
+async def get_user_by_id(
+    user_id: int, if_none_match: str = Header(None), session=Depends(db_read_session)
+):
+    logger.info("REQUEST: get user by ID")
+    if if_none_match is not None:
+        # answer from the row version alone, before loading the full row
+        version = await crud_get_user_version(session, user_id)
+        etag = make_etag(user_id, version)
+        if version is not None and etag_matches(if_none_match, etag, weak=True):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+    version, body = await crud_get_user_by_id(session, user_id)
+    logger.info("Data fetched successfully.")
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"ETag": make_etag(user_id, version)},
+    )
 
 
 @router.put("/{user_id}", response_model=UserGet, status_code=status.HTTP_200_OK)
 async def update_user(
-    user_id: int, request_body: UserUpdate, session=Depends(db_session)
+    user_id: int,
+    request_body: UserUpdate,
+    response: Response,
+    if_match: str = Header(None),
+    session=Depends(db_write_session),
 ):
-    logging.info("REQUEST: update user")
-    response = await crud_update_user(session, user_id, request_body)
-    logging.info("Data updated successfully.")
-    return response
+    logger.info("REQUEST: update user")
+    found = await crud_update_user(session, user_id, request_body, if_match)
+    response.headers["ETag"] = make_etag(user_id, found.version)
+    logger.info("Data updated successfully.")
+    return found
@@ -1,10 +1,14 @@
-from pydantic import BaseModel, ConfigDict, EmailStr, constr
+from pydantic import BaseModel, ConfigDict, conlist, constr
+
+from src.schemas.user_schema import NormalizedEmail
+
+TOKEN_BATCH_MAX = 100
 
 
 class LoginSchema(BaseModel):
     """Schema for login"""
 
-    email: EmailStr
+    email: NormalizedEmail
     password: constr(min_length=4, max_length=20)
 
 
@@ -12,3 +16,36 @@ class TokenSchema(BaseModel):
     """Schema to return and accept token"""
 
     access_token: str
+
+
+class TokenPairSchema(TokenSchema):
+    """Schema to return the tokens of a login session"""
+
+    refresh_token: str
+
+
+class RefreshSchema(BaseModel):
+    """Schema to accept a refresh token"""
+
+    refresh_token: str
+
+
+class TokenBatchSchema(BaseModel):
+    """Schema to accept tokens for batch introspection"""
+
+    access_tokens: conlist(str, min_length=1, max_length=TOKEN_BATCH_MAX)
+
+
+class TokenVerdictSchema(BaseModel):
+    """Schema to return the introspection result of a single token"""
+
+    valid: bool
+    claims: dict | None = None
+    message: str | None = None
+    detail: str | None = None
+
+
+class TokenBatchVerdictSchema(BaseModel):
+    """Schema to return introspection results in the order tokens were sent"""
+
+    results: list[TokenVerdictSchema]
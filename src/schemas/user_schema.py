@@ -2,7 +2,13 @@
 Module containing the schemas for the user model
 """
 
-from pydantic import BaseModel, ConfigDict, EmailStr, constr
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, constr
+
+# emails are stored and looked up lower-cased, Foo@x.com and foo@x.com are
+# the same user
+NormalizedEmail = Annotated[EmailStr, AfterValidator(str.lower)]
 
 
 class UserGet(BaseModel):
@@ -22,7 +28,7 @@ class UserCreate(BaseModel):
     Schema for creating a user
     """
 
-    email: EmailStr
+    email: NormalizedEmail
     password: constr(min_length=4, max_length=20)
     name: constr(min_length=4, max_length=20)
     surname: constr(min_length=4, max_length=20)
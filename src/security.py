@@ -2,14 +2,26 @@
 Module containing all the extensions used in the application
 """
 
+import asyncio
+import base64
+import concurrent.futures
 import datetime
+import functools
 import hashlib
+import hmac
+import os
+import secrets
 import sys
+import time
 
 from dotenv import dotenv_values
 import jwt
 
+from src.cache import LRUCache
 from src.errors import CustomException
+from src.keyring import KeyRing
+from src.metrics import hash_seconds, jwt_seconds
+from src.revocation import RevocationList
 
 
 env_values = dotenv_values(".env")
@@ -20,11 +32,88 @@ required_variables = [
     "DB_NAME",
     "DB_TEST_NAME",
     "DB_PORT",
+    "DB_POOL_SIZE",
+    "DB_MAX_OVERFLOW",
+    "DB_POOL_TIMEOUT",
+    "DB_POOL_RECYCLE",
+    "DB_POOL_PRE_PING",
+    "DB_POOL_PING_IDLE_SECONDS",
     "HASH_SALT",
     "SECRET_KEY",
     "ACCESS_TOKEN_EXPIRE_MINUTES",
 ]
 
+HASH_ALGORITHM = env_values.get("HASH_ALGORITHM", "scrypt")
+HASH_SCRYPT_N = int(env_values.get("HASH_SCRYPT_N", 2**14))
+HASH_PBKDF2_ITERATIONS = int(env_values.get("HASH_PBKDF2_ITERATIONS", 600000))
+HASH_SALT_BYTES = 16
+_hash_executor = None  # pylint: disable=invalid-name
+
+keyring = KeyRing(
+    env_values.get("JWT_ALGORITHM", "HS256"),
+    secret=env_values["SECRET_KEY"],
+    keys_dir=env_values.get("JWT_KEYS_DIR"),
+    active_kid=env_values.get("JWT_ACTIVE_KID"),
+)
+
+# verified token claims keyed by token digest, entries expire with the token
+token_cache = LRUCache(
+    int(env_values.get("TOKEN_CACHE_SIZE", 10000)),
+    float(env_values.get("TOKEN_CACHE_TTL_SECONDS", 300)),
+)
+
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(env_values.get("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+
+# sessions ended by logout, access tokens carrying their sid are rejected
+# until they expire on their own
+revoked_sessions = RevocationList(
+    int(env_values["ACCESS_TOKEN_EXPIRE_MINUTES"]) * 60 + 60
+)
+
+
+def _b64encode(value: bytes):
+    return base64.b64encode(value).decode().rstrip("=")
+
+
+def _b64decode(value: str):
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _kdf(algorithm: str, params: list, password: str, salt: bytes):
+    if algorithm == "scrypt":
+        cost, block_size, parallelism = params
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=cost, r=block_size, p=parallelism, dklen=32
+        )
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0])
+    raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+
+
+@functools.lru_cache(maxsize=4)
+def _dummy_hash(*scheme):  # pylint: disable=unused-argument
+    return SecurityManager.hash(secrets.token_hex(16))
+
+
+def hash_executor():
+    """Function to get the worker pool password hashing runs in, the pool is
+    configured with HASH_EXECUTOR (thread or process) and HASH_WORKERS
+
+    Returns:
+        Executor: shared executor
+    """
+    global _hash_executor  # pylint: disable=global-statement
+    if _hash_executor is None:
+        workers = int(env_values.get("HASH_WORKERS", os.cpu_count() or 1))
+        if env_values.get("HASH_EXECUTOR", "thread") == "process":
+            _hash_executor = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            _hash_executor = concurrent.futures.ThreadPoolExecutor(
+                workers, thread_name_prefix="hash"
+            )
+    return _hash_executor
+
 
 class SecurityManager:
     """
@@ -45,7 +134,29 @@ class SecurityManager:
 
     @staticmethod
     def hash(hash_string: str):
-        """Function to hash a string
+        """Function to hash a string with the configured slow KDF, the random
+        salt and KDF parameters are stored in the returned string
+
+        Args:
+            hash_string (str): String to be hashed
+
+        Returns:
+            str: Hashed string, e.g. scrypt$16384$8$1$<salt>$<hash>
+        """
+        if HASH_ALGORITHM == "scrypt":
+            params = [HASH_SCRYPT_N, 8, 1]
+        else:
+            params = [HASH_PBKDF2_ITERATIONS]
+        salt = os.urandom(HASH_SALT_BYTES)
+        digest = _kdf(HASH_ALGORITHM, params, hash_string, salt)
+        return "$".join(
+            [HASH_ALGORITHM, *map(str, params), _b64encode(salt), _b64encode(digest)]
+        )
+
+    @staticmethod
+    def legacy_hash(hash_string: str):
+        """Function to hash a string with the old salted MD5 scheme, only used to
+        verify hashes stored before the KDF was introduced
 
         Args:
             hash_string (str): String to be hashed
@@ -68,9 +179,82 @@ class SecurityManager:
         Returns:
             bool: True if the strings match, False otherwise
         """
-        if hashed_string == SecurityManager.hash(hash_string):
-            return True
-        return False
+        if "$" not in hashed_string:
+            expected = SecurityManager.legacy_hash(hash_string)
+            return hmac.compare_digest(hashed_string, expected)
+        algorithm, *params, salt, digest = hashed_string.split("$")
+        expected = _kdf(
+            algorithm, list(map(int, params)), hash_string, _b64decode(salt)
+        )
+        return hmac.compare_digest(_b64decode(digest), expected)
+
+    @staticmethod
+    def needs_rehash(hashed_string: str):
+        """Function to check if a hash was made with an outdated scheme or cost
+
+        Args:
+            hashed_string (str): Hashed string
+
+        Returns:
+            bool: True if the hash should be replaced on the next login
+        """
+        if HASH_ALGORITHM == "scrypt":
+            current = f"scrypt${HASH_SCRYPT_N}$8$1$"
+        else:
+            current = f"pbkdf2_sha256${HASH_PBKDF2_ITERATIONS}$"
+        return not hashed_string.startswith(current)
+
+    @staticmethod
+    def dummy_hash():
+        """Function to get a hash of a random password made with the current
+        scheme and cost, logins of unknown emails verify against it so they
+        take as long as wrong passwords
+
+        Returns:
+            str: Hashed string
+        """
+        return _dummy_hash(HASH_ALGORITHM, HASH_SCRYPT_N, HASH_PBKDF2_ITERATIONS)
+
+    @staticmethod
+    async def hash_async(hash_string: str):
+        """Function to hash a string in the hashing worker pool
+
+        Args:
+            hash_string (str): String to be hashed
+
+        Returns:
+            str: Hashed string
+        """
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                hash_executor(), SecurityManager.hash, hash_string
+            )
+        finally:
+            hash_seconds.observe(time.perf_counter() - start, "hash")
+
+    @staticmethod
+    async def compare_hash_async(hashed_string: str, hash_string: str):
+        """Function to compare a hashed string with a string in the hashing
+        worker pool
+
+        Args:
+            hashed_string (str): Hashed string
+            hash_string (str): String to be hashed
+
+        Returns:
+            bool: True if the strings match, False otherwise
+        """
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                hash_executor(),
+                SecurityManager.compare_hash,
+                hashed_string,
+                hash_string,
+            )
+        finally:
+            hash_seconds.observe(time.perf_counter() - start, "verify")
 
     @staticmethod
     def generate_jwt(
@@ -90,25 +274,77 @@ class SecurityManager:
         user_dict["exp"] = datetime.datetime.now(
             tz=datetime.timezone.utc
         ) + datetime.timedelta(minutes=expire)
-        return jwt.encode(
-            user_dict,
-            env_values["SECRET_KEY"],
-            algorithm="HS256",
-        )
+        start = time.perf_counter()
+        token = keyring.encode(user_dict)
+        jwt_seconds.observe(time.perf_counter() - start, "sign")
+        return token
+
+    @staticmethod
+    def generate_refresh_token():
+        """Function to generate an opaque refresh token
+
+        Returns:
+            Tuple[str, str]: refresh token and the hash to store
+        """
+        token = secrets.token_urlsafe(32)
+        return token, SecurityManager.refresh_token_hash(token)
+
+    @staticmethod
+    def refresh_token_hash(token: str):
+        """Function to hash a refresh token for storage, tokens are random so
+        a single fast hash is enough
+
+        Args:
+            token (str): refresh token
+
+        Returns:
+            str: hex encoded sha256
+        """
+        return hashlib.sha256(token.encode()).hexdigest()
 
     @staticmethod
     async def authenticate(token: str):
-        """Function to authenticate a JWT token
+        """Function to authenticate a JWT token, tokens verified before are
+        answered from token_cache until they expire, tokens of revoked
+        sessions are rejected
+
+        Args:
+            token (str): JWT token
+
+        Raises:
+            CustomException: When the token is expired, invalid or revoked
+
+        Returns:
+            dict: Decoded JWT token
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        if (claims := token_cache.get(digest)) is None:
+            claims = SecurityManager._decode(token)
+            token_cache.set(digest, claims, claims.get("exp"))
+        if (sid := claims.get("sid")) is not None and sid in revoked_sessions:
+            raise CustomException(
+                401,
+                "Token revoked",
+                "Session has ended, please login again.",
+            )
+        return claims
+
+    @staticmethod
+    def _decode(token: str):
+        """Function to verify a JWT token and decode its claims
 
         Args:
             token (str): JWT token
 
+        Raises:
+            CustomException: When the token is expired or invalid
+
         Returns:
             dict: Decoded JWT token
         """
+        start = time.perf_counter()
         try:
-            if jwt.decode(token, env_values["SECRET_KEY"], algorithms=["HS256"]):
-                return jwt.decode(token, env_values["SECRET_KEY"], algorithms=["HS256"])
+            claims = keyring.decode(token)
         except jwt.ExpiredSignatureError as exc:
             raise CustomException(
                 401,
@@ -121,3 +357,29 @@ class SecurityManager:
                 "Invalid token",
                 "Token is invalid, please login again.",
             ) from exc
+        finally:
+            jwt_seconds.observe(time.perf_counter() - start, "verify")
+        return claims
+
+    @staticmethod
+    async def authenticate_many(tokens: list):
+        """Function to authenticate several JWT tokens without stopping at the
+        first invalid one
+
+        Args:
+            tokens (list): JWT tokens
+
+        Returns:
+            list: verdict dictionary for every token, in the same order
+        """
+        verdicts = []
+        for token in tokens:
+            try:
+                claims = await SecurityManager.authenticate(token)
+            except CustomException as exc:
+                verdicts.append(
+                    {"valid": False, "message": exc.message, "detail": exc.detail}
+                )
+            else:
+                verdicts.append({"valid": True, "claims": claims})
+        return verdicts
@@ -2,7 +2,42 @@
 
 import logging
 
+import pydantic_core
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by pydantic-core instead of the stdlib json module
+    """
+
+    def render(self, content) -> bytes:
+        return pydantic_core.to_json(content)
+
+
+def dump_trusted(model: type[BaseModel], obj):
+    """Function to pick the fields of a response model from an object which
+    is already known to be valid, e.g. a row read from the database, without
+    validating it again
+
+    Args:
+        model (type[BaseModel]): response model
+        obj (Any): object with the model fields as attributes
+
+    Returns:
+        dict: field values
+    """
+    return {field: getattr(obj, field) for field in model.model_fields}
 
 
 def respond(status: int, detail: str, message: str, log_level: str = "error"):
@@ -16,20 +51,43 @@ def respond(status: int, detail: str, message: str, log_level: str = "error"):
 
 
     Returns:
-        JSONResponse: response
+        FastJSONResponse: response
     """
-    # q: change below logging to olazy formating %
-    log_map = {
-        "debug": logging.DEBUG,
-        "info": logging.INFO,
-        "warning": logging.WARNING,
-        "error": logging.ERROR,
-        "critical": logging.CRITICAL,
-    }
-
-    logging.log(log_map.get(log_level, logging.ERROR), "%s: %s", message, detail)
-
-    return JSONResponse(
+    logger.log(LOG_LEVELS.get(log_level, logging.ERROR), "%s: %s", message, detail)
+
+    return FastJSONResponse(
         status_code=status,
         content={"status code": status, "message": message, "detail": detail},
     )
+
+
+def make_etag(*parts):
+    """Function to build a strong ETag from the parts identifying a representation
+
+    Args:
+        *parts: values identifying the representation, e.g. ID and row version
+
+    Returns:
+        str: quoted ETag
+    """
+    return '"' + ".".join(map(str, parts)) + '"'
+
+
+def etag_matches(header: str | None, etag: str, weak: bool = False):
+    """Function to check an If-None-Match or If-Match header against an ETag
+
+    Args:
+        header (str | None): header value, may list several ETags or be *
+        etag (str): current ETag
+        weak (bool, optional): ignore the W/ prefix of the listed ETags, as
+        If-None-Match does. Defaults to False.
+
+    Returns:
+        bool: True if the header matches the ETag
+    """
+    if header is None:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    if weak:
+        candidates = [candidate.removeprefix("W/") for candidate in candidates]
+    return "*" in candidates or etag in candidates
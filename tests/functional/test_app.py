@@ -42,3 +42,11 @@ def test_database_error_offline(client_offline_db, user_data):
     response = client_offline_db.post("/user", json=user_data)
     print(response.json())
     assert response.status_code == 503
+
+
+def test_request_id_header(client):
+    # test the request ID is generated or taken from the client and echoed
+    response = client.get("/")
+    assert len(response.headers["x-request-id"]) == 32
+    response = client.get("/", headers={"X-Request-ID": "trace-123"})
+    assert response.headers["x-request-id"] == "trace-123"
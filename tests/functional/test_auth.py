@@ -1,4 +1,9 @@
 import pytest
+from fastapi.testclient import TestClient
+
+from src.crud.auth_crud import login_email_limiter, login_ip_limiter
+from src.models.user_model import User
+from src.security import SecurityManager, keyring
 
 router_prefix = "/auth"
 
@@ -52,6 +57,149 @@ def test_login_bad_data(client, user_data, create_users):
     assert response.json()["message"] == "Invalid credentials"
 
 
+def test_login_unknown_email_verifies_hash(client, create_users, monkeypatch):
+    # test an unknown email costs a password verification like a wrong password
+    verified = []
+
+    async def compare_hash_async(hashed_string, hash_string):
+        verified.append(hashed_string)
+        return False
+
+    monkeypatch.setattr(SecurityManager, "compare_hash_async", compare_hash_async)
+    response = client.post(
+        router_prefix + "/login",
+        json={"email": "unknown@gmail.com", "password": "test_user_pw_1"},
+    )
+    assert response.status_code == 401
+    assert verified == [SecurityManager.dummy_hash()]
+
+
+def test_login_email_case_insensitive(client, create_users):
+    # test the email matches whatever its case
+    response = client.post(
+        router_prefix + "/login",
+        json={"email": "Test_User1@GMAIL.com", "password": "test_user_pw_1"},
+    )
+    assert response.status_code == 200
+
+
+def test_login_rehashes_legacy_hash(client, session):
+    # test login upgrades a legacy MD5 hash to the current KDF
+    session.add(
+        User(
+            email="legacy_user@gmail.com",
+            password=SecurityManager.legacy_hash("legacy_pw"),
+            name="legacy_user",
+            surname="legacy_user",
+        )
+    )
+    session.commit()
+    user_data = {"email": "legacy_user@gmail.com", "password": "legacy_pw"}
+    response = client.post(router_prefix + "/login", json=user_data)
+    assert response.status_code == 200
+    session.expire_all()
+    user = session.query(User).filter_by(email=user_data["email"]).first()
+    assert not SecurityManager.needs_rehash(user.password)
+    assert SecurityManager.compare_hash(user.password, user_data["password"])
+    response = client.post(router_prefix + "/login", json=user_data)
+    assert response.status_code == 200
+
+
+def test_login_rate_limited_per_ip(client_offline_db, monkeypatch):
+    # test attempts over the IP limit are rejected before reaching the database
+    monkeypatch.setattr(login_ip_limiter, "limit", 2)
+    user_data = {"email": "test_user1@gmail.com", "password": "test_user_pw_1"}
+    for _ in range(2):
+        response = client_offline_db.post(router_prefix + "/login", json=user_data)
+        assert response.status_code == 503
+    response = client_offline_db.post(router_prefix + "/login", json=user_data)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert login_ip_limiter.stats()["rejected"] == 1
+
+
+def test_login_rate_limited_per_email(client, create_users, monkeypatch):
+    # test failed attempts exhaust the email limit, other emails still log in
+    monkeypatch.setattr(login_email_limiter, "limit", 2)
+    bad_data = {"email": "test_user1@gmail.com", "password": "wrong_pw"}
+    for _ in range(2):
+        response = client.post(router_prefix + "/login", json=bad_data)
+        assert response.status_code == 401
+    bad_data["password"] = "test_user_pw_1"
+    response = client.post(router_prefix + "/login", json=bad_data)
+    assert response.status_code == 429
+    response = client.post(
+        router_prefix + "/login",
+        json={"email": "test_user2@gmail.com", "password": "test_user_pw_2"},
+    )
+    assert response.status_code == 200
+
+
+def test_login_without_client_address(client, create_users, app):
+    # test a request without a client address, as over a unix socket, logs in
+    # and is only limited per email
+    async def without_client(scope, receive, send):
+        await app(dict(scope, client=None), receive, send)
+
+    response = TestClient(without_client).post(
+        router_prefix + "/login",
+        json={"email": "test_user1@gmail.com", "password": "test_user_pw_1"},
+    )
+    assert response.status_code == 200
+    assert login_ip_limiter.stats()["allowed"] == 0
+
+
+@pytest.fixture(scope="function")
+def tokens(client, create_users):
+    return client.post(
+        router_prefix + "/login",
+        json={"email": "test_user1@gmail.com", "password": "test_user_pw_1"},
+    ).json()
+
+
+def test_refresh_rotates_token(client, tokens):
+    # test refresh issues new tokens and the used refresh token stops working
+    response = client.post(
+        router_prefix + "/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+    renewed = response.json()
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    claims = keyring.decode(renewed["access_token"])
+    assert claims["email"] == "test_user1@gmail.com"
+    assert claims["sid"] == keyring.decode(tokens["access_token"])["sid"]
+    response = client.post(
+        router_prefix + "/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+    assert response.json()["message"] == "Invalid refresh token"
+
+
+def test_logout_revokes_session(client, tokens):
+    # test access tokens of a logged out session are rejected
+    access_token = {"access_token": tokens["access_token"]}
+    assert client.post(router_prefix, json=access_token).status_code == 200
+    response = client.post(
+        router_prefix + "/logout", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+    response = client.post(router_prefix, json=access_token)
+    assert response.status_code == 401
+    assert response.json()["message"] == "Token revoked"
+    response = client.post(
+        router_prefix + "/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_invalid_token(client):
+    # test refresh with an unknown token
+    response = client.post(router_prefix + "/refresh", json={"refresh_token": "x"})
+    assert response.status_code == 401
+    response = client.post(router_prefix + "/logout", json={"refresh_token": "x"})
+    assert response.status_code == 401
+
+
 def test_auth_ok(client, valid_token):
     # test auth
     response = client.post(router_prefix, json={"access_token": valid_token})
@@ -70,3 +218,40 @@ def test_auth_invalid_token(client):
     response = client.post(router_prefix, json={"access_token": "some_token"})
     assert response.status_code == 401
     assert response.json()["message"] == "Invalid token"
+
+
+def test_auth_batch_ok(client, valid_token, expired_token):
+    # test batch introspection returns a verdict per token in order
+    tokens = [valid_token, expired_token, "some_token", valid_token]
+    response = client.post(router_prefix + "/batch", json={"access_tokens": tokens})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["valid"] for result in results] == [True, False, False, True]
+    assert results[0]["claims"]["name"] == "name"
+    assert results[1]["message"] == "Token expired"
+    assert results[2]["message"] == "Invalid token"
+
+
+@pytest.mark.parametrize("tokens", [[], ["some_token"] * 101])
+def test_auth_batch_bad_data(client, tokens):
+    # test batch introspection rejects empty and oversized batches
+    response = client.post(router_prefix + "/batch", json={"access_tokens": tokens})
+    assert response.status_code == 422
+
+
+def test_jwks_etag(client):
+    # test JWKS is served with an ETag and answers 304 when unchanged
+    response = client.get(router_prefix + "/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "keys" in response.json()
+    etag = response.headers["ETag"]
+    response = client.get(
+        router_prefix + "/.well-known/jwks.json", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    for if_none_match in (f'"other", {etag}', "*", f"W/{etag}"):
+        response = client.get(
+            router_prefix + "/.well-known/jwks.json",
+            headers={"If-None-Match": if_none_match},
+        )
+        assert response.status_code == 304
@@ -0,0 +1,70 @@
+"""
+Test metrics endpoint functionality.
+"""
+
+from src.profiler import QueryProfiler
+from src.routers import metrics_router
+
+router_prefix = "/metrics"
+
+
+def test_pool_metrics_ok(client):
+    # test pool statistics
+    response = client.get(f"{router_prefix}/pool")
+    assert response.status_code == 200
+    for key in ("size", "checked_out", "idle", "overflow", "wait_seconds_total"):
+        assert key in response.json()
+    assert response.json()["checkout_seconds"]["buckets"]["+Inf"] >= 0
+
+
+def test_token_cache_metrics_ok(client, valid_token):
+    # test token cache counters follow authentication requests
+    client.post("/auth", json={"access_token": valid_token})
+    client.post("/auth", json={"access_token": valid_token})
+    response = client.get(f"{router_prefix}/token-cache")
+    assert response.status_code == 200
+    assert response.json()["hits"] >= 1
+
+
+def test_prometheus_metrics_ok(client, create_users):
+    # test request, password hash and JWT metrics in the Prometheus format
+    client.get("/user/1")
+    client.post(
+        "/auth/login",
+        json={"email": "test_user1@gmail.com", "password": "test_user_pw_1"},
+    )
+    response = client.get(router_prefix)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/user/{user_id}",'
+        'status="200"}'
+    ) in response.text
+    assert 'password_hash_seconds_count{operation="verify"}' in response.text
+    assert 'jwt_seconds_count{operation="sign"}' in response.text
+    assert "# TYPE http_requests_in_flight gauge" in response.text
+
+
+def test_query_metrics_disabled(client):
+    # test the query profile is not available unless enabled
+    response = client.get(f"{router_prefix}/queries")
+    assert response.status_code == 404
+
+
+def test_query_metrics_ok(client, monkeypatch):
+    # test the top statements of the query profiler
+    profiler = QueryProfiler(threshold=10)
+    monkeypatch.setattr(metrics_router, "query_profiler", profiler)
+    profiler.record(None, "SELECT $1", (1,), 0.2)
+    profiler.record(None, "SELECT $1", (2,), 0.2)
+    profiler.record(None, "UPDATE t SET a = $1", (1,), 0.3)
+    response = client.get(f"{router_prefix}/queries", params={"limit": 1})
+    assert response.status_code == 200
+    assert response.json()["statements"][0]["statement"] == "SELECT ?"
+    response = client.get(f"{router_prefix}/queries", params={"order": "max"})
+    assert [row["statement"] for row in response.json()["statements"]] == [
+        "UPDATE t SET a = ?",
+        "SELECT ?",
+    ]
+    assert client.delete(f"{router_prefix}/queries").status_code == 204
+    assert client.get(f"{router_prefix}/queries").json()["statements"] == []
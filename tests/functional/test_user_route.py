@@ -2,12 +2,27 @@
 Test user endpoint functionality.
 """
 
-import pytest
+import asyncio
+import json
 
+import pytest
+from sqlalchemy import insert, text
+
+from src.crud.user_crud import (
+    PAGE_LIMIT_DEFAULT,
+    crud_update_user,
+    select_user_by_email,
+    select_users_after,
+    user_cache,
+)
 from src.models.user_model import User
+from src.schemas.user_schema import UserUpdate
 from src.security import SecurityManager
+from tests.conftest import TestingAsyncSessionLocal, async_engine
 
 router_prefix = "/user"
+# rows the user list asks for, one more than the page to detect a next page
+PAGE_LIMIT = PAGE_LIMIT_DEFAULT + 1
 
 
 @pytest.mark.parametrize(
@@ -71,6 +86,23 @@ def test_post_user_email_exists(client, user_data, session, create_users):
     assert response.json()["detail"] == "User with this email already exists."
 
 
+def test_post_user_email_case_insensitive(client, session, create_users):
+    # test emails are stored lower-cased and differing case is a duplicate
+    user_data = {
+        "email": "New_User@Gmail.com",
+        "password": "new_user_pw",
+        "name": "new_user",
+        "surname": "new_user",
+    }
+    response = client.post(router_prefix, json=user_data)
+    assert response.status_code == 201
+    assert response.json()["email"] == "new_user@gmail.com"
+    user_data["email"] = "TEST_USER1@gmail.com"
+    response = client.post(router_prefix, json=user_data)
+    assert response.status_code == 422
+    assert session.query(User).count() == 4
+
+
 @pytest.mark.parametrize(
     "user_data",
     [
@@ -171,6 +203,45 @@ def test_get_user_by_id_ok(client, create_users, id):
     assert response.json()["id"] == id
 
 
+def test_get_user_by_id_cached(client, create_users):
+    # test repeated profile reads are served from the cache and updates refresh it
+    assert client.get(f"{router_prefix}/1").json()["name"] == "test_user_1"
+    assert client.get(f"{router_prefix}/1").json()["name"] == "test_user_1"
+    assert client.get("/metrics/user-cache").json()["hits"] == 1
+    client.put(f"{router_prefix}/1", json={"name": "new_name"})
+    assert client.get(f"{router_prefix}/1").json()["name"] == "new_name"
+
+
+def test_get_user_by_id_fill_racing_update(client, create_users, monkeypatch):
+    # test a read-fill of a row SELECTed before an update keeps the newer entry
+    fill = user_cache.set
+
+    async def update_then_fill(key, value):
+        monkeypatch.setattr(user_cache, "set", fill)
+        async with TestingAsyncSessionLocal() as session:
+            await crud_update_user(session, key, UserUpdate(name="new_name"))
+        await fill(key, value)
+
+    monkeypatch.setattr(user_cache, "set", update_then_fill)
+    assert client.get(f"{router_prefix}/1").json()["name"] == "test_user_1"
+    response = client.get(f"{router_prefix}/1")
+    assert response.json()["name"] == "new_name"
+    assert response.headers["ETag"] == '"1.2"'
+    assert client.get("/metrics/user-cache").json()["hits"] == 1
+
+
+def test_get_user_by_id_cached_after_password_change(client, create_users):
+    # test a password change refreshes the cached entry with the new version
+    etag = client.get(f"{router_prefix}/1").headers["ETag"]
+    client.put(
+        f"{router_prefix}/change-password",
+        json={"id": 1, "old_password": "test_user_pw_1", "new_password": "new_pw_1"},
+    )
+    response = client.get(f"{router_prefix}/1")
+    assert response.headers["ETag"] != etag
+    assert client.get("/metrics/user-cache").json()["hits"] == 1
+
+
 @pytest.mark.parametrize("id", [10, 20, 30])
 def test_get_user_by_id_no_exist(client, create_users, id):
     # test get user by id when data does not exist
@@ -191,6 +262,7 @@ def test_get_all_users_ok(client, create_users):
     response = client.get(router_prefix)
     assert response.status_code == 200
     assert len(response.json()) == 3
+    assert set(response.json()[0]) == {"id", "email", "name", "surname"}
 
 
 def test_get_all_users_no_exist(client):
@@ -200,6 +272,43 @@ def test_get_all_users_no_exist(client):
     assert response.json() == []
 
 
+def test_get_all_users_paginated(client, create_users):
+    # test keyset pagination follows the next cursor until the last page
+    response = client.get(router_prefix, params={"limit": 2})
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == [1, 2]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(router_prefix, params={"limit": 2, "cursor": cursor})
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == [3]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"limit": 0},
+        {"limit": 1001},
+        {"cursor": "not a cursor"},
+        {"cursor": "eyJpZCI6ICJhIn0="},
+        {"cursor": "not a cursor", "stream": True},
+    ],
+)
+def test_get_all_users_bad_params(client, create_users, params):
+    # test pagination with invalid limit or cursor
+    response = client.get(router_prefix, params=params)
+    assert response.status_code == 422
+
+
+def test_get_all_users_stream(client, create_users):
+    # test streaming all users as NDJSON
+    response = client.get(router_prefix, params={"stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+
 @pytest.mark.parametrize(
     "user_data",
     [
@@ -240,3 +349,182 @@ def test_put_user_bad_data(client, user_data, create_users):
     id = user_data.pop("id")
     response = client.put(f"{router_prefix}/{id}", json=user_data)
     assert response.status_code == 422
+
+
+def test_import_users_ok(client, session, create_users):
+    # test bulk import reports inserted, invalid and conflicting rows
+    rows = [
+        {
+            "email": f"imported_{i}@gmail.com",
+            "password": f"imported_pw_{i}",
+            "name": "imported",
+            "surname": "imported",
+        }
+        for i in range(5)
+    ]
+    rows.append(dict(rows[0]))
+    rows.append({**rows[1], "email": "test_user1@gmail.com"})
+    rows.append({"email": "not an email", "password": "pw"})
+    response = client.post(
+        f"{router_prefix}/import", params={"chunk_size": 3}, json=rows
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["rows"] == 8
+    assert report["inserted"] == 5
+    assert report["invalid"] == 1
+    assert report["conflicts"] == 2
+    assert len(report["chunks"]) == 3
+    assert report["chunks"][2]["invalid"][0]["row"] == 7
+    # invalid passwords are not echoed back
+    errors = report["chunks"][2]["invalid"][0]["errors"]
+    assert "password" in {error["loc"][0] for error in errors}
+    assert all(set(error) == {"type", "loc", "msg"} for error in errors)
+    conflicts = [email for chunk in report["chunks"] for email in chunk["conflicts"]]
+    assert sorted(conflicts) == ["imported_0@gmail.com", "test_user1@gmail.com"]
+    imported = session.query(User).filter_by(email="imported_4@gmail.com").first()
+    assert SecurityManager.compare_hash(imported.password, "imported_pw_4")
+
+
+def test_get_user_by_id_etag(client, create_users):
+    # test conditional GET answers 304 until the user is updated
+    response = client.get(f"{router_prefix}/1")
+    etag = response.headers["ETag"]
+    response = client.get(f"{router_prefix}/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    client.put(f"{router_prefix}/1", json={"name": "new_name"})
+    response = client.get(f"{router_prefix}/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_all_users_etag(client, create_users):
+    # test conditional GET of a page answers 304 until a user on it changes
+    etag = client.get(router_prefix).headers["ETag"]
+    response = client.get(router_prefix, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    client.put(f"{router_prefix}/2", json={"name": "new_name"})
+    response = client.get(router_prefix, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_put_user_if_match(client, create_users):
+    # test optimistic concurrency with If-Match
+    etag = client.get(f"{router_prefix}/1").headers["ETag"]
+    response = client.put(
+        f"{router_prefix}/1", json={"name": "first_name"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    response = client.put(
+        f"{router_prefix}/1", json={"name": "second_name"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    assert client.get(f"{router_prefix}/1").json()["name"] == "first_name"
+
+
+def test_reads_use_replica(client, create_users, replica):
+    # test reads go to the replica and writes to the primary
+    assert client.get(router_prefix).status_code == 200
+    assert client.get(f"{router_prefix}/1").status_code == 200
+    assert len(replica) == 2
+    response = client.put(f"{router_prefix}/1", json={"name": "new_name"})
+    assert response.status_code == 200
+    assert len(replica) == 2
+
+
+def test_replica_reads_not_cached(client, create_users, replica):
+    # test rows read from a replica do not fill the user cache
+    assert client.get(f"{router_prefix}/1").status_code == 200
+    assert client.get(f"{router_prefix}/1").status_code == 200
+    assert len(replica) == 2
+    assert client.get("/metrics/user-cache").json()["hits"] == 0
+    client.cookies.set("read_primary_until", "9999999999")
+    assert client.get(f"{router_prefix}/1").status_code == 200
+    assert client.get(f"{router_prefix}/1").status_code == 200
+    assert client.get("/metrics/user-cache").json()["hits"] == 1
+
+
+def test_read_your_writes(client, create_users, replica):
+    # test the client reads from the primary right after its own write
+    client.put(f"{router_prefix}/1", json={"name": "new_name"})
+    assert "read_primary_until" in client.cookies
+    assert client.get(router_prefix).json()[0]["name"] == "new_name"
+    assert len(replica) == 0
+    client.cookies.set("read_primary_until", "0")
+    assert client.get(router_prefix).status_code == 200
+    assert len(replica) == 1
+
+
+@pytest.mark.parametrize(
+    "params, ids",
+    [
+        ({"email": "TEST_USER2"}, [2]),
+        ({"name": "Test_User_"}, [1, 2, 3]),
+        ({"surname": "test_user_3", "name": "test"}, [3]),
+        ({"email": "test%"}, []),
+        ({"email": "nobody"}, []),
+    ],
+)
+def test_get_all_users_search(client, create_users, params, ids):
+    # test case-insensitive prefix filters, LIKE wildcards are matched literally
+    response = client.get(router_prefix, params=params)
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == ids
+
+
+def test_get_all_users_search_paginated(client, create_users):
+    # test filters combine with the keyset cursor
+    params = {"name": "TEST", "limit": 2}
+    response = client.get(router_prefix, params=params)
+    assert [user["id"] for user in response.json()] == [1, 2]
+    params["cursor"] = response.headers["X-Next-Cursor"]
+    response = client.get(router_prefix, params=params)
+    assert [user["id"] for user in response.json()] == [3]
+
+
+@pytest.mark.parametrize(
+    "query, index",
+    [
+        (
+            select_users_after(None, {"email": "User199"}).limit(PAGE_LIMIT),
+            "uq_user_email_lower",
+        ),
+        (
+            select_users_after(None, {"name": "Name199"}).limit(PAGE_LIMIT),
+            "ix_user_name_lower",
+        ),
+        (
+            select_users_after(None, {"surname": "Surname199"}).limit(PAGE_LIMIT),
+            "ix_user_surname_lower",
+        ),
+        (select_user_by_email("User1@Gmail.com"), "uq_user_email_lower"),
+    ],
+)
+def test_lookup_uses_index(session, query, index):
+    # test the planner picks the lower() indexes on its own for the prefix
+    # filters and the login lookup, sent with bind parameters as the app does
+    session.execute(
+        insert(User),
+        [
+            {
+                "email": f"user{i}@gmail.com",
+                "password": "hash",
+                "name": f"name{i}",
+                "surname": f"surname{i}",
+            }
+            for i in range(2000)
+        ],
+    )
+    session.execute(text('ANALYZE "user"'))
+    session.commit()
+    compiled = query.compile(dialect=async_engine.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    async def explain():
+        async with async_engine.connect() as conn:
+            result = await conn.exec_driver_sql(f"EXPLAIN {compiled}", parameters)
+            return "\n".join(row[0] for row in result)
+
+    assert index in asyncio.run(explain())
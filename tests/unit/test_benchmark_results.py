@@ -0,0 +1,48 @@
+"""
+Test benchmarks/results.py module.
+"""
+
+import argparse
+import math
+
+from benchmarks.results import compare, finish, load
+
+
+def test_compare_regressions():
+    # test costs regress when they grow and throughput when it drops
+    baseline = {
+        "endpoint.get": {"rps": 100, "p99_ms": 10, "errors": 0},
+        "micro.hash": {"us_per_op": 100},
+    }
+    current = {
+        "endpoint.get": {"rps": 80, "p99_ms": 10.5, "errors": 2},
+        "micro.hash": {"us_per_op": 50},
+        "micro.new": {"us_per_op": 1},
+    }
+    rows = {
+        (row["name"], row["metric"]): row for row in compare(baseline, current, 0.1)
+    }
+    assert set(rows) == {
+        ("endpoint.get", "rps"),
+        ("endpoint.get", "p99_ms"),
+        ("endpoint.get", "errors"),
+        ("micro.hash", "us_per_op"),
+    }
+    assert rows["endpoint.get", "rps"]["change"] == 0.2
+    assert rows["endpoint.get", "rps"]["regressed"]
+    assert not rows["endpoint.get", "p99_ms"]["regressed"]
+    assert rows["endpoint.get", "errors"]["change"] == math.inf
+    assert rows["micro.hash", "us_per_op"]["change"] == -0.5
+    assert not rows["micro.hash", "us_per_op"]["regressed"]
+
+
+def test_finish_saves_and_compares(tmp_path, capsys):
+    # test results are saved as JSON and compared against a baseline
+    baseline = str(tmp_path / "baseline.json")
+    args = argparse.Namespace(output=baseline, baseline=None, tolerance=0.1)
+    assert finish({"micro.hash": {"us_per_op": 100}}, args) == 0
+    assert load(baseline) == {"micro.hash": {"us_per_op": 100}}
+    args = argparse.Namespace(output=None, baseline=baseline, tolerance=0.1)
+    assert finish({"micro.hash": {"us_per_op": 105}}, args) == 0
+    assert finish({"micro.hash": {"us_per_op": 120}}, args) == 1
+    assert "REGRESSED" in capsys.readouterr().out
@@ -0,0 +1,106 @@
+"""
+Test cache.py module.
+"""
+
+import asyncio
+import time
+
+from src.cache import LRUCache, MemorySharedCache, ReadThroughCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    # test cache stays bounded and keeps recently used entries
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+
+def test_lru_cache_expiry():
+    # test entries expire at their own expiry or the default ttl
+    cache = LRUCache(10, ttl=60)
+    cache.set("expired", 1, expires_at=time.time() - 1)
+    cache.set("fresh", 2, expires_at=time.time() + 3600)
+    assert cache.get("expired") is None
+    assert cache.get("fresh") == 2
+    assert cache._entries["fresh"][1] <= time.time() + 60
+
+
+def test_lru_cache_stats():
+    # test hit and miss counters
+    cache = LRUCache(10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats() == {
+        "size": 1,
+        "max_size": 10,
+        "hits": 1,
+        "misses": 1,
+        "hit_ratio": 0.5,
+    }
+    cache.clear()
+    assert cache.stats()["hits"] == 0
+
+
+def test_read_through_cache_tiers():
+    # test shared tier hits refill the local tier and deletes reach both
+    shared = MemorySharedCache()
+    cache = ReadThroughCache("user", LRUCache(10), shared, ttl=60)
+    asyncio.run(cache.set(1, b"payload"))
+    cache.local.clear()
+    assert asyncio.run(cache.get(1)) == b"payload"
+    assert asyncio.run(cache.get(1)) == b"payload"
+    assert asyncio.run(cache.get(2)) is None
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["shared_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["lookup_seconds"]["count"] == 3
+    asyncio.run(cache.delete(1))
+    assert asyncio.run(shared.get("user:1")) is None
+    assert asyncio.run(cache.get(1)) is None
+
+
+def test_lru_cache_keeps_higher_version():
+    # test a value of a lower version does not replace a live entry
+    cache = LRUCache(10)
+    cache.set("a", "new", version=2)
+    cache.set("a", "old", version=1)
+    assert cache.get("a") == "new"
+    cache.set("a", "unversioned")
+    assert cache.get("a") == "unversioned"
+    cache.set("b", "expired", expires_at=time.time() - 1, version=2)
+    cache.set("b", "old", version=1)
+    assert cache.get("b") == "old"
+
+
+def test_read_through_cache_keeps_higher_version():
+    # test a stale fill reaches neither tier once a newer payload is stored
+    shared = MemorySharedCache()
+    cache = ReadThroughCache(
+        "user", LRUCache(10), shared, version_of=lambda value: int(value[:1])
+    )
+    asyncio.run(cache.set(1, b"2 new"))
+    asyncio.run(cache.set(1, b"1 old"))
+    assert asyncio.run(cache.get(1)) == b"2 new"
+    assert asyncio.run(shared.get("user:1")) == b"2 new"
+    cache.local.clear()
+    assert asyncio.run(cache.get(1)) == b"2 new"
+    asyncio.run(cache.set(1, b"1 old"))
+    assert asyncio.run(cache.get(1)) == b"2 new"
+    asyncio.run(cache.set(1, b"3 newer"))
+    assert asyncio.run(shared.get("user:1")) == b"3 newer"
+
+
+def test_read_through_cache_shared_failure():
+    # test an unavailable shared backend degrades to a miss
+    class BrokenCache(MemorySharedCache):
+        async def get(self, key):
+            raise ConnectionError("down")
+
+    cache = ReadThroughCache("user", LRUCache(10), BrokenCache())
+    assert asyncio.run(cache.get(1)) is None
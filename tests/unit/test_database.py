@@ -0,0 +1,58 @@
+"""
+Test database.py module.
+"""
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from src import database
+from src.database import make_engine
+from tests.conftest import TEST_DB_URL, async_engine
+
+
+def ping_after_terminate(monkeypatch, pre_ping: bool):
+    """Function to terminate the backend of a pooled connection while it is
+    idle and check out a connection again
+
+    Args:
+        monkeypatch (MonkeyPatch): pytest monkeypatch
+        pre_ping (bool): value of DB_POOL_PRE_PING
+
+    Returns:
+        bool: True if the second checkout could run a query
+    """
+    monkeypatch.setattr(database, "PING_IDLE_SECONDS", 0)
+    monkeypatch.setattr(database, "PRE_PING", pre_ping)
+    engine = make_engine(TEST_DB_URL.render_as_string(hide_password=False))
+
+    async def run():
+        async with engine.connect() as conn:
+            pid = await conn.scalar(text("SELECT pg_backend_pid()"))
+            # end the transaction so the return to the pool has nothing to
+            # roll back on the dead connection
+            await conn.commit()
+            async with async_engine.connect() as other:
+                await other.execute(
+                    text("SELECT pg_terminate_backend(:pid)"), {"pid": pid}
+                )
+        try:
+            async with engine.connect() as conn:
+                return await conn.scalar(text("SELECT 1")) == 1
+        except DBAPIError:
+            return False
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_idle_ping_replaces_dead_connection(monkeypatch):
+    # test a connection terminated while idle is replaced on the next checkout
+    assert ping_after_terminate(monkeypatch, pre_ping=True)
+
+
+def test_idle_ping_disabled(monkeypatch):
+    # test the terminated connection is handed out again without the ping
+    assert not ping_after_terminate(monkeypatch, pre_ping=False)
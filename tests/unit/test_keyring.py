@@ -0,0 +1,64 @@
+"""
+Test keyring.py module.
+"""
+
+import json
+import os
+import time
+
+import jwt
+import pytest
+
+from src.keyring import KeyRing, generate_key
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+def test_keyring_sign_and_verify_with_jwks(tmp_path, algorithm):
+    # test tokens verify offline against the published JWKS
+    generate_key(tmp_path, algorithm)
+    keyring = KeyRing(algorithm, keys_dir=tmp_path)
+    token = keyring.encode({"name": "name"})
+    assert jwt.get_unverified_header(token)["kid"] == keyring.active_kid
+    assert keyring.decode(token) == {"name": "name"}
+    jwk = json.loads(keyring.jwks)["keys"][0]
+    assert jwk["kid"] == keyring.active_kid
+    assert "d" not in jwk
+    public_key = jwt.PyJWK(jwk).key
+    assert jwt.decode(token, public_key, algorithms=[algorithm]) == {"name": "name"}
+
+
+def test_keyring_rotation(tmp_path):
+    # test the newest key signs while tokens of the older key still verify
+    old_path = generate_key(tmp_path, "RS256")
+    os.utime(old_path, (time.time() - 60, time.time() - 60))
+    old_token = KeyRing("RS256", keys_dir=tmp_path).encode({"name": "old"})
+    new_path = generate_key(tmp_path, "RS256")
+    keyring = KeyRing("RS256", keys_dir=tmp_path)
+    assert keyring.active_kid == new_path.stem
+    assert keyring.decode(old_token) == {"name": "old"}
+    assert len(json.loads(keyring.jwks)["keys"]) == 2
+    old_path.unlink()
+    with pytest.raises(jwt.InvalidTokenError):
+        KeyRing("RS256", keys_dir=tmp_path).decode(old_token)
+
+
+def test_keyring_hs256_publishes_nothing():
+    # test the shared secret is never part of the JWKS
+    keyring = KeyRing("HS256", secret="secret")
+    assert keyring.decode(keyring.encode({"name": "name"})) == {"name": "name"}
+    assert json.loads(keyring.jwks) == {"keys": []}
+
+
+def test_keyring_without_keys(tmp_path):
+    # test asymmetric signing refuses to start without keys
+    with pytest.raises(ValueError):
+        KeyRing("RS256", keys_dir=tmp_path)
+
+
+@pytest.mark.parametrize("keys_dir", [None, ""])
+def test_keyring_without_keys_dir(tmp_path, monkeypatch, keys_dir):
+    # test asymmetric signing never falls back to keys in the working directory
+    generate_key(tmp_path, "RS256")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError, match="JWT_KEYS_DIR"):
+        KeyRing("RS256", keys_dir=keys_dir)
@@ -0,0 +1,89 @@
+"""
+Test logs.py module.
+"""
+
+import io
+import json
+import logging
+
+import pytest
+from src.logs import LogPipeline, current_request_id
+
+
+@pytest.fixture
+def pipeline_logger():
+    """Pytest fixture giving a logger writing through its own pipeline."""
+    stream = io.StringIO()
+    pipeline = LogPipeline("DEBUG", sample_rate=1.0, queue_size=1000, stream=stream)
+    logger = logging.getLogger("test_logs")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(pipeline.handler)
+    try:
+        yield pipeline, logger, stream
+    finally:
+        logger.removeHandler(pipeline.handler)
+        pipeline.stop()
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_with_request_id(pipeline_logger):
+    # test records are written by the listener as JSON with the request ID
+    pipeline, logger, stream = pipeline_logger
+    pipeline.start()
+    token = current_request_id.set("abc")
+    try:
+        logger.info("REQUEST: %s", "login")
+    finally:
+        current_request_id.reset(token)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    pipeline.stop()
+    first, second = records(stream)
+    assert first["message"] == "REQUEST: login"
+    assert first["level"] == "INFO"
+    assert first["logger"] == "test_logs"
+    assert first["request_id"] == "abc"
+    assert "request_id" not in second
+    assert "ValueError: boom" in second["exception"]
+
+
+def test_sampling_keeps_whole_requests(pipeline_logger):
+    # test INFO records are sampled per request and warnings are always kept
+    pipeline, logger, stream = pipeline_logger
+    pipeline.filter.threshold = 0x7FFFFFFF
+    pipeline.start()
+    for i in range(200):
+        token = current_request_id.set(f"request-{i}")
+        try:
+            logger.info("first")
+            logger.info("second")
+            logger.warning("warning")
+        finally:
+            current_request_id.reset(token)
+    pipeline.stop()
+    lines = records(stream)
+    kept = {line["request_id"] for line in lines if line["level"] == "INFO"}
+    assert 0 < len(kept) < 200
+    assert sum(line["level"] == "WARNING" for line in lines) == 200
+    assert sum(line["level"] == "INFO" for line in lines) == 2 * len(kept)
+    assert pipeline.stats()["sampled_out"] == 2 * (200 - len(kept))
+
+
+def test_full_queue_drops_records(pipeline_logger):
+    # test records are dropped instead of blocking while nothing reads the queue
+    pipeline, logger, _ = pipeline_logger
+    for _ in range(1050):
+        logger.info("record")
+    assert pipeline.stats() == {"queued": 1000, "dropped": 50, "sampled_out": 0}
+
+
+def test_unknown_level():
+    # test an unknown LOG_LEVEL is rejected
+    with pytest.raises(ValueError):
+        LogPipeline("LOUD")
@@ -0,0 +1,53 @@
+"""
+Test metrics.py module.
+"""
+
+import asyncio
+
+from sqlalchemy import text
+
+from src.database import make_engine
+from src.metrics import (
+    Gauge,
+    HistogramFamily,
+    Registry,
+    RequestTimer,
+    current_request,
+    db_statement_seconds,
+)
+from src.security import env_values
+
+
+def test_registry_renders_prometheus_text():
+    # test histogram buckets are cumulative and labelled
+    registry = Registry()
+    latency = registry.register(
+        HistogramFamily("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    )
+    gauge = registry.register(Gauge("in_flight", "In flight."))
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    gauge.add(2)
+    gauge.add(-1)
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{route="/a"} 2' in lines
+    assert "in_flight 1" in lines
+
+
+def test_statement_time_added_to_request():
+    # test cursor events add the statement time to the current request
+    engine = make_engine(env_values["DB_TEST_URI"])
+    count = db_statement_seconds.child().count
+
+    async def select_one():
+        current_request.set(timer := RequestTimer())
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT pg_sleep(0.01)"))
+        await engine.dispose()
+        return timer
+
+    assert asyncio.run(select_one()).db_seconds >= 0.01
+    assert db_statement_seconds.child().count > count
@@ -0,0 +1,65 @@
+"""
+Test profiler.py module.
+"""
+
+import asyncio
+
+from src import database
+from src.database import make_engine
+from src.profiler import QueryProfiler, fingerprint
+from src.security import env_values
+
+
+def test_fingerprint():
+    # test parameters, literals and list lengths do not split fingerprints
+    assert fingerprint(
+        'SELECT "user".id \nFROM "user" \nWHERE "user".id IN ($1::INTEGER, $2::INTEGER)'
+        " AND name = 'o''neil' LIMIT 10"
+    ) == (
+        'SELECT "user".id FROM "user" WHERE "user".id IN (?, ...) AND name = ? LIMIT ?'
+    )
+    assert fingerprint("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4)") == fingerprint(
+        "INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)"
+    )
+    assert fingerprint("SELECT user_1.id FROM user AS user_1") == (
+        "SELECT user_1.id FROM user AS user_1"
+    )
+
+
+def test_top_statements():
+    # test statistics per fingerprint ordered by cost
+    profiler = QueryProfiler(threshold=10)
+    for _ in range(99):
+        profiler.record(None, "SELECT $1::INTEGER", (1,), 0.001)
+    profiler.record(None, "SELECT $1::INTEGER", (1,), 0.1)
+    profiler.record(None, "UPDATE t SET a = $1", (1,), 0.5)
+    fast, slow = profiler.top(order="count")
+    assert fast["statement"] == "SELECT ?"
+    assert fast["count"] == 100
+    assert round(fast["total"], 3) == 0.199
+    assert fast["p99"] == 0.001
+    assert fast["max"] == 0.1
+    assert profiler.top(limit=1)[0]["statement"] == "UPDATE t SET a = ?"
+    profiler.reset()
+    assert profiler.top() == []
+
+
+def test_slow_query_explained(monkeypatch):
+    # test a slow statement is explained over a separate connection
+    profiler = QueryProfiler(threshold=0)
+    monkeypatch.setattr(database, "query_profiler", profiler)
+    engine = make_engine(env_values["DB_TEST_URI"])
+
+    async def run():
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1 + $1::INTEGER", (1,))
+            await conn.exec_driver_sql("SELECT 1 + $1::INTEGER", (2,))
+        while profiler._tasks:  # pylint: disable=protected-access
+            await asyncio.sleep(0.01)
+        await engine.dispose()
+
+    asyncio.run(run())
+    (row,) = [row for row in profiler.top() if row["statement"] == "SELECT ? + ?"]
+    assert row["count"] == 2
+    assert row["plan"].startswith("Result")
+    assert not any(row["statement"].startswith("EXPLAIN") for row in profiler.top())
@@ -0,0 +1,59 @@
+"""
+Test ratelimit.py module.
+"""
+
+import asyncio
+
+from src import ratelimit
+from src.ratelimit import MemoryBucketStore, RateLimiter
+
+
+class Clock:
+    """Monotonic clock advanced by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills(monkeypatch):
+    # test the bucket empties and refills at limit per period
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    limiter = RateLimiter("test", MemoryBucketStore(), limit=2, period=10)
+    assert asyncio.run(limiter.hit("key")) == 0
+    assert asyncio.run(limiter.hit("key")) == 0
+    assert asyncio.run(limiter.hit("key")) == 5
+    assert asyncio.run(limiter.hit("other")) == 0
+    clock.now += 5
+    assert asyncio.run(limiter.hit("key")) == 0
+    assert limiter.stats() == {"limit": 2, "period": 10, "allowed": 4, "rejected": 1}
+
+
+def test_token_bucket_check_only(monkeypatch):
+    # test a zero cost hit checks the bucket without spending
+    monkeypatch.setattr(ratelimit.time, "monotonic", Clock())
+    limiter = RateLimiter("test", MemoryBucketStore(), limit=1, period=10)
+    assert asyncio.run(limiter.hit("key", cost=0)) == 0
+    assert asyncio.run(limiter.hit("key")) == 0
+    assert asyncio.run(limiter.hit("key", cost=0)) == 10
+
+
+def test_memory_store_bounded():
+    # test least recently used buckets are dropped
+    store = MemoryBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        asyncio.run(store.take(key, 1, 1, 1))
+    assert list(store._buckets) == ["b", "c"]  # pylint: disable=protected-access
+
+
+def test_limiter_allows_when_backend_fails():
+    # test a failing shared backend does not reject logins
+    class BrokenStore:
+        async def take(self, *args):
+            raise ConnectionError("backend down")
+
+    limiter = RateLimiter("test", BrokenStore(), limit=1, period=10)
+    assert asyncio.run(limiter.hit("key")) == 0
@@ -0,0 +1,50 @@
+"""
+Test revocation.py module.
+"""
+
+import asyncio
+import datetime
+import time
+
+from src.revocation import BloomFilter, RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    # test every added key is reported as present
+    bloom = BloomFilter(1 << 12)
+    keys = [f"sid-{i}" for i in range(200)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert sum(f"other-{i}" in bloom for i in range(1000)) < 50
+
+
+def test_revocation_list_refresh_is_incremental():
+    # test refresh reads from the watermark and keeps earlier revocations
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    rows = [("a", now - datetime.timedelta(seconds=2)), ("b", now)]
+    calls = []
+
+    async def fetch(since):
+        calls.append(since)
+        return [row for row in rows if row[1] >= since]
+
+    revoked = RevocationList(retention=60)
+    assert asyncio.run(revoked.refresh(fetch)) == 2
+    assert "a" in revoked and "b" in revoked and "c" not in revoked
+    assert revoked.watermark == now
+    rows.append(("c", now + datetime.timedelta(seconds=1)))
+    asyncio.run(revoked.refresh(fetch))
+    assert calls[1] == now - RevocationList.OVERLAP
+    assert "c" in revoked and "a" in revoked
+    assert revoked.stats()["revoked"] == 3
+
+
+def test_revocation_list_prune():
+    # test revocations older than the retention are forgotten
+    revoked = RevocationList(retention=60)
+    revoked.add("old", time.time() - 120)
+    revoked.add("new")
+    revoked.prune()
+    assert "old" not in revoked
+    assert "new" in revoked
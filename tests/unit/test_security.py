@@ -2,10 +2,14 @@
 Test extensions.py module.
 """
 
+import asyncio
+from unittest.mock import Mock
+
+import jwt
 import pytest
 
 from src.errors import CustomException
-from src.security import SecurityManager
+from src.security import SecurityManager, token_cache
 
 
 def test_env_validation(monkeypatch):
@@ -18,3 +22,73 @@ def test_env_validation(monkeypatch):
     monkeypatch.setattr("src.security.required_variables", ["KEY"])
     with pytest.raises(SystemExit):
         SecurityManager.validate_env()
+
+
+def test_hash_ok():
+    # test KDF hashes are salted and verify against the original string
+    hashed = SecurityManager.hash("password")
+    assert hashed != SecurityManager.hash("password")
+    assert len(hashed) <= 255
+    assert SecurityManager.compare_hash(hashed, "password")
+    assert not SecurityManager.compare_hash(hashed, "passwork")
+    assert not SecurityManager.needs_rehash(hashed)
+
+
+def test_hash_pbkdf2(monkeypatch):
+    # test the PBKDF2 variant and that changing the scheme asks for a rehash
+    monkeypatch.setattr("src.security.HASH_ALGORITHM", "pbkdf2_sha256")
+    monkeypatch.setattr("src.security.HASH_PBKDF2_ITERATIONS", 1000)
+    hashed = SecurityManager.hash("password")
+    assert hashed.startswith("pbkdf2_sha256$1000$")
+    assert SecurityManager.compare_hash(hashed, "password")
+    monkeypatch.setattr("src.security.HASH_PBKDF2_ITERATIONS", 2000)
+    assert SecurityManager.needs_rehash(hashed)
+
+
+def test_legacy_hash():
+    # test hashes stored with the old MD5 scheme still verify
+    hashed = SecurityManager.legacy_hash("password")
+    assert SecurityManager.compare_hash(hashed, "password")
+    assert not SecurityManager.compare_hash(hashed, "passwork")
+    assert SecurityManager.needs_rehash(hashed)
+
+
+def test_dummy_hash(monkeypatch):
+    # test the dummy hash follows the current scheme and cost
+    monkeypatch.setattr("src.security.HASH_ALGORITHM", "pbkdf2_sha256")
+    monkeypatch.setattr("src.security.HASH_PBKDF2_ITERATIONS", 1000)
+    dummy = SecurityManager.dummy_hash()
+    assert dummy is SecurityManager.dummy_hash()
+    assert not SecurityManager.needs_rehash(dummy)
+    monkeypatch.setattr("src.security.HASH_PBKDF2_ITERATIONS", 2000)
+    assert SecurityManager.dummy_hash().startswith("pbkdf2_sha256$2000$")
+
+
+def test_hash_async():
+    # test hashing in the worker pool
+    async def hash_and_compare():
+        hashed = await SecurityManager.hash_async("password")
+        return await SecurityManager.compare_hash_async(hashed, "password")
+
+    assert asyncio.run(hash_and_compare())
+
+
+def test_authenticate_caches_verified_token(monkeypatch, valid_token):
+    # test a token is decoded once and then served from the cache
+    token_cache.clear()
+    decode = Mock(wraps=jwt.decode)
+    monkeypatch.setattr("src.security.jwt.decode", decode)
+    first = asyncio.run(SecurityManager.authenticate(valid_token))
+    second = asyncio.run(SecurityManager.authenticate(valid_token))
+    assert first == second
+    assert decode.call_count == 1
+    assert token_cache.stats()["hits"] == 1
+
+
+def test_authenticate_does_not_cache_invalid_token(expired_token):
+    # test rejected tokens are not cached
+    token_cache.clear()
+    for _ in range(2):
+        with pytest.raises(CustomException):
+            asyncio.run(SecurityManager.authenticate(expired_token))
+    assert token_cache.stats()["size"] == 0
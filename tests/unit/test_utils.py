@@ -0,0 +1,42 @@
+"""
+Test utils.py module.
+"""
+
+import collections
+import json
+
+from src.schemas.user_schema import UserGet
+from src.utils import FastJSONResponse, dump_trusted, etag_matches, make_etag
+
+
+def test_fast_json_response_matches_stdlib():
+    # test the response body decodes to the same content as stdlib json
+    content = {"status code": 200, "message": "ąčę", "items": [1, 2.5, None]}
+    response = FastJSONResponse(content)
+    assert json.loads(response.body) == content
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_dump_trusted_picks_model_fields():
+    # test only the response model fields are taken from a row
+    row = collections.namedtuple("Row", "id email name surname version password")(
+        1, "user@gmail.com", "name", "surname", 3, "hash"
+    )
+    assert dump_trusted(UserGet, row) == {
+        "id": 1,
+        "email": "user@gmail.com",
+        "name": "name",
+        "surname": "surname",
+    }
+
+
+def test_etag_matches():
+    # test If-None-Match lists and wildcard
+    etag = make_etag(1, 2)
+    assert etag == '"1.2"'
+    assert etag_matches(f'"0.1", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"1.1"', etag)
+    assert etag_matches(f"W/{etag}", etag, weak=True)
+    assert not etag_matches(f"W/{etag}", etag)